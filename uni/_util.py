@@ -14,6 +14,7 @@
 #   You should have received a copy of the GNU Lesser General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import collections.abc
+import heapq
 import os
 
 
@@ -40,33 +41,30 @@ class ClassDict(collections.abc.MutableMapping):
         return len(self.dct)
 
 
+def _decorate(iterable, i, key):
+    for x in iterable:
+        yield key(x), i, x
+
+
 class MinIter:
-    def __init__(self, *iterables):
-        self._iterators = []
-        self._values = []
-        for iterable in iterables:
-            iterator = iter(iterable)
-            try:
-                value = next(iterator)
-            except StopIteration:
-                continue
-            self._iterators.append(iterator)
-            self._values.append(value)
+    ''' Lazily merge sorted iterables, comparing key(item) if given.
+
+        Range tuples can be merged with `key=operator.itemgetter(0)`.
+    '''
+    def __init__(self, *iterables, key=None):
+        if key is None:
+            self._merged = heapq.merge(*iterables)
+        else:
+            # heapq.merge only takes a key since Python 3.5. The index breaks
+            # ties in order, without ever comparing the items themselves.
+            decorated = [_decorate(it, i, key) for i, it in enumerate(iterables)]
+            self._merged = (x for _, _, x in heapq.merge(*decorated))
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        if not self._values:
-            raise StopIteration
-        idx = min(range(len(self._values)), key=lambda i: self._values[i])
-        rv = self._values[idx]
-        try:
-            self._values[idx] = next(self._iterators[idx])
-        except StopIteration:
-            del self._iterators[idx]
-            del self._values[idx]
-        return rv
+        return next(self._merged)
 
 
 class ProgrammerIsAnIdiotError(AssertionError):
@@ -0,0 +1,168 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+''' Measure the startup cost of importing the package.
+
+Every scenario runs in a fresh interpreter, so imports are always cold
+(apart from the bytecode cache). For each one, record the best time, the
+number of gc-tracked objects created, the tracemalloc current/peak, and
+(since Python 3.7) the `-X importtime` breakdown of the uni modules
+involved.
+'''
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+
+import uni
+
+
+SCENARIOS = [
+    ('uni.prop_base', 'import uni.prop_base'),
+    ('uni.prop_alias', 'import uni.prop_alias'),
+    ('uni.prop_alias:classes', 'import uni.prop_alias; uni.prop_alias.materialize()'),
+    ('uni.prop_alias:values', '''
+import uni.prop_alias
+for n in uni.prop_alias.__all__:
+    c = getattr(uni.prop_alias, n)
+    getattr(c, 'value_list', None)
+    getattr(c, 'regex', None)
+'''),
+    ('uni.txt.schema', 'import uni.txt.schema'),
+]
+
+_CHILD = '''
+import gc, json, sys, time, tracemalloc
+if %(trace)r:
+    tracemalloc.start()
+objects = len(gc.get_objects())
+start = time.perf_counter()
+%(stmt)s
+rv = {'seconds': time.perf_counter() - start}
+rv['objects'] = len(gc.get_objects()) - objects
+if %(trace)r:
+    rv['current'], rv['peak'] = tracemalloc.get_traced_memory()
+json.dump(rv, sys.stdout)
+'''
+
+_IMPORTTIME = re.compile(r'import time:\s*(\d+) \|\s*(\d+) \|\s*(\S+)')
+
+
+def _run(args, stderr=None):
+    top = os.path.dirname(os.path.dirname(os.path.abspath(uni.__file__)))
+    path = os.environ.get('PYTHONPATH')
+    env = dict(os.environ, PYTHONPATH=top if not path else top + os.pathsep + path)
+    return subprocess.check_output([sys.executable] + list(args), env=env,
+            stderr=stderr, universal_newlines=True)
+
+
+def parse_importtime(text):
+    ''' Return {module: (self_us, cumulative_us)} for the uni modules.
+    '''
+    rv = {}
+    for m in _IMPORTTIME.finditer(text):
+        if m.group(3) == 'uni' or m.group(3).startswith('uni.'):
+            rv[m.group(3)] = (int(m.group(1)), int(m.group(2)))
+    return rv
+
+
+def measure(stmt, repeat):
+    ''' Run a statement in `repeat` fresh interpreters, and one traced one.
+    '''
+    times = []
+    for _ in range(repeat):
+        rv = json.loads(_run(['-c', _CHILD % {'trace': False, 'stmt': stmt}]))
+        times.append(rv['seconds'])
+    rv.update(json.loads(_run(['-c', _CHILD % {'trace': True, 'stmt': stmt}])))
+    rv['seconds'] = min(times)
+    if sys.version_info >= (3, 7):
+        rv['modules'] = parse_importtime(_run(['-X', 'importtime', '-c', stmt], stderr=subprocess.STDOUT))
+    return rv
+
+
+def run(repeat=5, scenarios=None):
+    if scenarios is None:
+        scenarios = SCENARIOS
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'repeat': repeat,
+        'results': {name: measure(stmt, repeat) for name, stmt in scenarios},
+    }
+
+
+# Timings are noisy, so they get more slack than (deterministic) memory.
+TOLERANCE = {
+    'seconds': 1.5,
+    'objects': 1.1,
+    'current': 1.1,
+    'peak': 1.1,
+}
+
+
+def compare(old, new, tolerance=TOLERANCE):
+    ''' Return a list of (scenario, metric, old, new) that got worse.
+    '''
+    rv = []
+    for name, new_result in sorted(new['results'].items()):
+        old_result = old['results'].get(name)
+        if old_result is None:
+            continue
+        for metric, slack in sorted(tolerance.items()):
+            if new_result[metric] > old_result[metric] * slack:
+                rv.append((name, metric, old_result[metric], new_result[metric]))
+    return rv
+
+
+def main(args=None, exe=None):
+    if args is None:
+        args = sys.argv[1:]
+    if exe is None:
+        exe = sys.argv[0]
+    repeat = 5
+    output = None
+    baseline = None
+    for arg in args:
+        if arg.startswith('--repeat='):
+            repeat = int(arg[len('--repeat='):])
+        elif arg.startswith('--output='):
+            output = arg[len('--output='):]
+        elif arg.startswith('--baseline='):
+            baseline = arg[len('--baseline='):]
+        else:
+            sys.exit('Usage: %s [--repeat=N] [--output=FILE] [--baseline=FILE]' % exe) # pragma: no cover
+    if baseline is not None:
+        # Read it first, in case it is also the output.
+        with open(baseline) as fo:
+            old = json.load(fo)
+    results = run(repeat)
+    text = json.dumps(results, indent=2, sort_keys=True) + '\n'
+    if output is None:
+        sys.stdout.write(text)
+    else:
+        with open(output, 'w') as fo:
+            fo.write(text)
+    if baseline is not None:
+        worse = compare(old, results)
+        for name, metric, before, after in worse:
+            print('%s: %s went from %r to %r' % (name, metric, before, after), file=sys.stderr)
+        if worse:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+''' Measure lookup throughput of the uni.mem search strategies.
+
+The same SortedMap/RangeMap/AutoMap/AutoSet contents are built under each
+backend (uni.mem.sorted, uni.mem.cfbs, ...) from real UCD data, cut down
+to several sizes, then probed with random, sequential, and real-text
+streams of codepoints.
+'''
+import collections
+import collections.abc
+import importlib
+import json
+import os
+import random
+import sys
+import time
+
+from .. import _util
+from ..txt import schema
+
+
+BACKENDS = ['sorted', 'cfbs', 'trie']
+CONTAINERS = ['SortedMap', 'RangeMap', 'AutoMap', 'AutoSet']
+STREAMS = ['random', 'sequential', 'text']
+SIZES = [100, 1000, 10000, None]
+
+UCD = os.path.join(os.path.dirname(__file__), '../../www.unicode.org/Public/9.0.0/ucd')
+
+# Each dataset is a list of files, whose rows are either (range, value)
+# or (codepoint, property, value).
+DATASETS = collections.OrderedDict([
+    ('Scripts', ['Scripts.txt']),
+    ('LineBreak', ['LineBreak.txt']),
+    ('DerivedAge', ['DerivedAge.txt']),
+    ('Unihan', [
+        'Unihan_DictionaryLikeData.txt',
+        'Unihan_NumericValues.txt',
+        'Unihan_OtherMappings.txt',
+        'Unihan_RadicalStrokeCounts.txt',
+        'Unihan_Variants.txt',
+    ]),
+])
+TEXT = 'NormalizationTest.txt'
+
+
+def load_items(ucd, files, *, jobs=1, cache_dir=None):
+    ''' Return a sorted list of (codepoint, value) for a dataset.
+
+        For Unihan files, the value is how many properties a codepoint has.
+    '''
+    rv = {}
+    for rows in schema.load_files([os.path.join(ucd, f) for f in files], jobs=jobs, cache_dir=cache_dir):
+        for row in rows:
+            if isinstance(row[0], tuple):
+                (low, high), value = row
+                for cp in range(low, high + 1):
+                    rv[cp] = value
+            else:
+                rv[row[0]] = rv.get(row[0], 0) + 1
+    return sorted(rv.items())
+
+
+def make_streams(keys, text, count, rng):
+    ''' Return {stream name: list of codepoints}.
+    '''
+    low = keys[0]
+    high = keys[-1]
+    start = rng.randint(low, high)
+    text = [ord(c) for c in text]
+    offset = rng.randrange(len(text))
+    return {
+        'random': [rng.randint(low, high) for _ in range(count)],
+        'sequential': [low + (start - low + i) % (high - low + 1) for i in range(count)],
+        'text': (text[offset:] + text * (count // len(text) + 1))[:count],
+    }
+
+
+def build(module, container, items):
+    cls = getattr(module, container)
+    if container.endswith('Set'):
+        return cls([k for k, v in items])
+    return cls(items)
+
+
+def _time_lookups(obj, keys):
+    if isinstance(obj, collections.abc.Set):
+        start = time.perf_counter()
+        for k in keys:
+            k in obj
+        return time.perf_counter() - start
+    get = obj.get
+    start = time.perf_counter()
+    for k in keys:
+        get(k)
+    return time.perf_counter() - start
+
+
+def measure(obj, keys, repeat):
+    ''' Return the lookups per second of the best of `repeat` runs.
+    '''
+    best = min([_time_lookups(obj, keys) for _ in range(repeat)])
+    return len(keys) / best if best else float('inf')
+
+
+def run(*, ucd=UCD, datasets=None, backends=None, containers=None, sizes=None, text=None,
+        count=20000, repeat=3, seed=0, jobs=1, cache_dir=None):
+    if datasets is None:
+        datasets = list(DATASETS)
+    if backends is None:
+        backends = BACKENDS
+    if containers is None:
+        containers = CONTAINERS
+    if sizes is None:
+        sizes = SIZES
+    if text is None:
+        text = os.path.join(ucd, TEXT)
+    with open(text, encoding='utf-8') as fo:
+        text = fo.read()
+    modules = {b: importlib.import_module('uni.mem.' + b) for b in backends}
+    results = []
+    for dataset in datasets:
+        all_items = load_items(ucd, DATASETS[dataset], jobs=jobs, cache_dir=cache_dir)
+        for size in sizes:
+            if size is None or size >= len(all_items):
+                items = all_items
+            else:
+                # ordered_sample uses the global generator.
+                random.seed(seed)
+                items = _util.ordered_sample(all_items, size)
+            rng = random.Random(seed)
+            streams = make_streams([k for k, v in items], text, count, rng)
+            for container in containers:
+                objs = {b: build(m, container, items) for b, m in modules.items()}
+                first = None
+                for backend, obj in objs.items():
+                    contents = list(obj.items()) if hasattr(obj, 'items') else list(obj)
+                    if first is None:
+                        first = contents
+                    assert contents == first, (dataset, container, backend)
+                    for stream, keys in streams.items():
+                        results.append({
+                            'dataset': dataset,
+                            'size': len(items),
+                            'container': container,
+                            'backend': backend,
+                            'stream': stream,
+                            'lookups_per_second': measure(obj, keys, repeat),
+                        })
+    return {
+        'count': count,
+        'repeat': repeat,
+        'seed': seed,
+        'results': results,
+    }
+
+
+def _split(arg, prefix, choices=None):
+    rv = arg[len(prefix):].split(',')
+    if choices is not None:
+        for x in rv:
+            if x not in choices:
+                sys.exit('Unknown value %r, expected one of: %s' % (x, ', '.join(choices))) # pragma: no cover
+    return rv
+
+
+def main(args=None, exe=None):
+    if args is None:
+        args = sys.argv[1:]
+    if exe is None:
+        exe = sys.argv[0]
+    kwargs = {}
+    output = None
+    for arg in args:
+        if arg.startswith('--data='):
+            kwargs['datasets'] = _split(arg, '--data=', DATASETS)
+        elif arg.startswith('--backends='):
+            kwargs['backends'] = _split(arg, '--backends=')
+        elif arg.startswith('--containers='):
+            kwargs['containers'] = _split(arg, '--containers=', CONTAINERS)
+        elif arg.startswith('--sizes='):
+            kwargs['sizes'] = [None if s == 'all' else int(s) for s in _split(arg, '--sizes=')]
+        elif arg.startswith('--count='):
+            kwargs['count'] = int(arg[len('--count='):])
+        elif arg.startswith('--repeat='):
+            kwargs['repeat'] = int(arg[len('--repeat='):])
+        elif arg.startswith('--text='):
+            kwargs['text'] = arg[len('--text='):]
+        elif arg.startswith('--ucd='):
+            kwargs['ucd'] = arg[len('--ucd='):]
+        elif arg.startswith('--jobs='):
+            kwargs['jobs'] = int(arg[len('--jobs='):]) or None
+        elif arg.startswith('--cache='):
+            kwargs['cache_dir'] = arg[len('--cache='):]
+        elif arg.startswith('--output='):
+            output = arg[len('--output='):]
+        else:
+            sys.exit('Usage: %s [--data=Scripts,...] [--backends=sorted,...] [--containers=AutoMap,...] [--sizes=100,...,all] [--count=N] [--repeat=N] [--text=FILE] [--ucd=DIR] [--jobs=N] [--cache=DIR] [--output=FILE]' % exe) # pragma: no cover
+    results = run(**kwargs)
+    text = json.dumps(results, indent=2, sort_keys=True) + '\n'
+    if output is None:
+        sys.stdout.write(text)
+    else:
+        with open(output, 'w') as fo:
+            fo.write(text)
+    best = {}
+    for r in results['results']:
+        key = (r['dataset'], r['size'], r['container'], r['stream'])
+        if key not in best or r['lookups_per_second'] > best[key][1]:
+            best[key] = (r['backend'], r['lookups_per_second'])
+    for key, (backend, lps) in sorted(best.items()):
+        print('%-10s %7d %-9s %-10s best: %-6s %10.0f/s' % (key + (backend, lps)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+from uni.bench import imports
+
+
+class TestImports(unittest.TestCase):
+    def test_parse_importtime(self):
+        text = '\n'.join([
+            'import time: self [us] | cumulative | imported package',
+            'import time:       100 |        100 |   json',
+            'import time:       200 |        300 |     uni.prop_base',
+            'import time:        50 |        350 | uni',
+        ])
+        assert imports.parse_importtime(text) == {'uni.prop_base': (200, 300), 'uni': (50, 350)}
+
+    def test_measure(self):
+        rv = imports.measure('import uni.versioning', 1)
+        assert rv['seconds'] > 0
+        assert rv['peak'] >= rv['current'] > 0
+        assert rv['objects'] > 0
+        # -X importtime is new in Python 3.7.
+        if sys.version_info >= (3, 7):
+            assert 'uni.versioning' in rv['modules']
+            with unittest.mock.patch.object(sys, 'version_info', (3, 6, 15)):
+                rv = imports.measure('import uni.versioning', 1)
+        assert 'modules' not in rv and rv['objects'] > 0
+
+    def test_compare(self):
+        old = {'results': {'a': {'seconds': 1.0, 'objects': 10, 'current': 100, 'peak': 200}}}
+        new = {'results': {
+            'a': {'seconds': 2.0, 'objects': 10, 'current': 100, 'peak': 300},
+            'b': {'seconds': 9.0, 'objects': 90, 'current': 900, 'peak': 900},
+        }}
+        assert imports.compare(old, new) == [('a', 'peak', 200, 300), ('a', 'seconds', 1.0, 2.0)]
+        assert imports.compare(old, old) == []
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, 'out.json')
+            base = os.path.join(tmp, 'base.json')
+            scenarios = [('uni', 'import uni')]
+            with open(base, 'w') as fo:
+                json.dump({'results': {'uni': {'seconds': 100.0, 'objects': 10**6, 'current': 10**9, 'peak': 10**9}}}, fo)
+            old_scenarios = imports.SCENARIOS
+            imports.SCENARIOS = scenarios
+            try:
+                with unittest.mock.patch.object(sys, 'argv', ['bench', '--repeat=1', '--output=' + out, '--baseline=' + base]):
+                    imports.main()
+                with open(out) as fo:
+                    assert list(json.load(fo)['results']) == ['uni']
+                with open(base, 'w') as fo:
+                    json.dump({'results': {'uni': {'seconds': 0.0, 'objects': 0, 'current': 0, 'peak': 0}}}, fo)
+                stdout = io.StringIO()
+                stderr = io.StringIO()
+                with self.assertRaises(SystemExit), contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                    imports.main(['--repeat=1', '--baseline=' + base], 'bench')
+                assert list(json.loads(stdout.getvalue())['results']) == ['uni']
+                lines = stderr.getvalue().splitlines()
+                assert [l.split(' went from ')[0] for l in lines] == ['uni: current', 'uni: objects', 'uni: peak', 'uni: seconds']
+                assert lines[-1].startswith('uni: seconds went from 0.0 to ')
+            finally:
+                imports.SCENARIOS = old_scenarios
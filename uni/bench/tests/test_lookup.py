@@ -0,0 +1,79 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+from uni.bench import lookup
+
+
+class TestLookup(unittest.TestCase):
+    def test_streams(self):
+        streams = lookup.make_streams([10, 20, 30], 'ab', 7, random.Random(0))
+        assert sorted(streams) == lookup.STREAMS
+        assert all(10 <= k <= 30 for k in streams['random'])
+        seq = streams['sequential']
+        assert all(b - a in (1, -20) for a, b in zip(seq, seq[1:])), seq
+        assert set(streams['text']) == {ord('a'), ord('b')}
+        assert all(len(s) == 7 for s in streams.values())
+
+    def test_run(self):
+        rv = lookup.run(datasets=['Scripts'], backends=['sorted', 'cfbs'], sizes=[50, 500], count=100, repeat=1)
+        results = rv['results']
+        assert len(results) == 2 * 4 * 2 * 3
+        sizes = {r['size'] for r in results}
+        assert sizes == {50, 500}
+        assert all(r['lookups_per_second'] > 0 for r in results)
+
+    def test_all(self):
+        rv = lookup.run(datasets=['Scripts'], backends=['sorted'], containers=['RangeMap'], sizes=[10**9], count=10, repeat=1)
+        assert {r['size'] for r in rv['results']} == {len(lookup.load_items(lookup.UCD, ['Scripts.txt']))}
+
+    def test_defaults(self):
+        datasets = {'Scripts': lookup.DATASETS['Scripts']}
+        with unittest.mock.patch.object(lookup, 'DATASETS', datasets), unittest.mock.patch.object(lookup, 'SIZES', [20]):
+            rv = lookup.run(count=10, repeat=1)
+        results = rv['results']
+        assert len(results) == len(lookup.BACKENDS) * len(lookup.CONTAINERS) * len(lookup.STREAMS)
+        assert {r['backend'] for r in results} == set(lookup.BACKENDS)
+        assert {r['container'] for r in results} == set(lookup.CONTAINERS)
+        assert {(r['dataset'], r['size']) for r in results} == {('Scripts', 20)}
+
+    def test_unihan(self):
+        items = lookup.load_items(lookup.UCD, ['Unihan_NumericValues.txt'])
+        assert (0x4E00, 1) in items
+        assert all(type(v) is int for k, v in items)
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, 'out.json')
+            args = ['--data=DerivedAge', '--backends=sorted', '--containers=RangeMap', '--sizes=20,all', '--count=50', '--repeat=1', '--jobs=1', '--cache=' + tmp]
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                lookup.main(args + ['--output=' + out, '--ucd=' + lookup.UCD, '--text=' + os.path.join(lookup.UCD, 'ReadMe.txt')])
+            with open(out) as fo:
+                assert len(json.load(fo)['results']) == 2 * 3
+            assert 'best: sorted' in stderr.getvalue()
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr), unittest.mock.patch.object(sys, 'argv', ['bench'] + args):
+                lookup.main()
+            assert json.loads(stdout.getvalue())['count'] == 50
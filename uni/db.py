@@ -0,0 +1,392 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+''' Per-codepoint properties of one Unicode version, stored by column.
+
+Every file of the UCD whose rows are keyed by codepoint is loaded, and each
+property it has becomes one column: a range-compressed `uni.mem` AutoMap
+from codepoint to value. Looking up several properties of a codepoint then
+costs one search per property, instead of a scan of each file.
+
+When several files have the same property (e.g. UnicodeData.txt and
+extracted/DerivedGeneralCategory.txt), the Derived* file is used, since it
+also lists the default values. A property that has several rows for the
+same codepoint (e.g. Name_Alias) gets a tuple of all of them.
+
+Several versions can share one `VersionedDatabase`: the newest is stored
+whole, and every other version only stores the ranges where it differs.
+'''
+import importlib
+import operator
+import os
+
+from . import prop_base as base, prop_alias as alias
+from .txt import schema as _schema
+from . import versioning
+
+
+_KEY_FIELDS = (base.Codepoint, base.CodepointRange, base.U_Codepoint)
+# Files that only list codepoints, for a boolean property.
+_IMPLIED = {
+    'CompositionExclusions': 'Composition_Exclusion',
+}
+_low_key = operator.itemgetter(0)
+# In a version's delta, marks codepoints that have no value in that version.
+_MISSING = object()
+_UNCHANGED = object()
+
+
+def is_property_file(fn):
+    ''' Return whether a file has properties keyed by codepoint.
+    '''
+    sn, ext, ver = _schema.get_schema_info(fn)
+    if ver is None or ext.lower() != '.txt' or sn.startswith('diff'):
+        return False
+    schema = _schema._schemas.get(sn)
+    if schema is None:
+        return False
+    fields = schema.required_fields + schema.opt_fields
+    return bool(fields) and fields[0] in _KEY_FIELDS
+
+
+def resolve(prop):
+    ''' Return the property class for a property or any of its names.
+    '''
+    if isinstance(prop, str):
+        rv = base.PropertyPerSe.value_by_name.get(base._casefold(prop))
+        if rv is None:
+            # Internal properties (X_*) are only available by exact name.
+            rv = getattr(alias, prop, None)
+        if not isinstance(rv, type) or not issubclass(rv, base._Property):
+            raise KeyError(prop)
+        return rv
+    return prop
+
+
+def _make_row_values(sn, fields):
+    ''' Return a function to list the (property, value) pairs of a row.
+
+        If a property appears more than once (e.g. the 3 numeric fields
+        of UnicodeData), the last value that is not None wins.
+    '''
+    implied = _IMPLIED.get(sn)
+    if implied is not None:
+        implied = [(getattr(alias, implied), True)]
+        return lambda row: implied
+    plain = [(i, cls) for i, cls in enumerate(fields) if i and not isinstance(cls, _schema._ref) and cls.__module__ == alias.__name__]
+    # The value of these (if any) is in the next field; otherwise they're binary.
+    per_se = [i for i, cls in enumerate(fields) if cls is base.PropertyPerSe]
+    def row_values(row):
+        rv = {}
+        for i, cls in plain:
+            value = row[i]
+            if value is not None:
+                rv[cls] = value
+        for i in per_se:
+            value = row[i + 1] if i + 1 < len(row) else None
+            rv[row[i]] = True if value is None else value
+        return rv.items()
+    return row_values
+
+
+def _combine_duplicates(name, triples):
+    # Sort (stably, so that repeats stay in file order), then merge rows
+    # for the same codepoints into tuples.
+    triples.sort(key=_low_key)
+    rv = []
+    multi = False
+    for low_key, high_key, value in triples:
+        if rv and rv[-1][1] >= low_key:
+            if rv[-1][:2] != (low_key, high_key):
+                raise ValueError('overlapping ranges for %s at %r' % (name, (low_key, high_key)))
+            rv[-1][2].append(value)
+            multi = True
+        else:
+            rv.append((low_key, high_key, [value]))
+    if multi:
+        return [(low_key, high_key, tuple(values)) for low_key, high_key, values in rv]
+    return [(low_key, high_key, values[0]) for low_key, high_key, values in rv]
+
+
+class Database:
+    ''' Per-codepoint properties of one Unicode version, stored by column.
+    '''
+    def __init__(self, version, columns):
+        self.version = version
+        self._columns = columns
+        self._by_name = {}
+
+    @classmethod
+    def from_files(cls, files, *, backend='sorted', jobs=1, cache_dir=None):
+        ''' Load the property files among `files`, which must all be of
+            the same version. The members of .zip archives count too.
+        '''
+        mem = importlib.import_module('uni.mem.' + backend)
+        infos = []
+        for name, source in _schema.expand_archives(files):
+            if is_property_file(name):
+                sn, ext, ver = _schema.get_schema_info(name)
+                infos.append((not sn.startswith('Derived'), name, source, sn, ver))
+        infos.sort(key=lambda info: info[:2])
+        versions = {ver for _, _, _, _, ver in infos}
+        if len(versions) > 1:
+            raise ValueError('files from more than one version: %s' % ', '.join(sorted(map(str, versions))))
+        version = versions.pop() if versions else None
+        all_rows = _schema.load_files([source for _, _, source, _, _ in infos], jobs=jobs, cache_dir=cache_dir)
+        columns = {}
+        for (_, _, _, sn, ver), rows in zip(infos, all_rows):
+            schema = _schema._schemas[sn]
+            row_values = _make_row_values(sn, schema.required_fields + schema.opt_fields)
+            found = {}
+            for row in rows:
+                key = row[0]
+                low_key, high_key = key if isinstance(key, tuple) else (key, key)
+                for prop, value in row_values(row):
+                    if prop not in columns:
+                        found.setdefault(prop, []).append((low_key, high_key, value))
+            for prop, triples in found.items():
+                triples = _combine_duplicates(prop.__name__, triples)
+                columns[prop] = mem.AutoMap.from_sorted_ranges(triples, packed=True)
+        return cls(version, columns)
+
+    @classmethod
+    def from_directory(cls, ucd, **kwargs):
+        ''' Load every property file under a directory (e.g. `9.0.0/ucd`).
+        '''
+        files = sorted([os.path.join(d, f) for d, _, fs in os.walk(ucd) for f in fs])
+        return cls.from_files(files, **kwargs)
+
+    def properties(self):
+        ''' Return the properties that have a column, sorted by name.
+        '''
+        return sorted(self._columns, key=operator.attrgetter('__name__'))
+
+    def column(self, prop):
+        ''' Return the column of a property, an AutoMap by codepoint.
+
+            Use its `lookup_many` to look up many codepoints at once, or
+            its `items_ranges` to walk the whole column.
+        '''
+        try:
+            return self._by_name[prop]
+        except KeyError:
+            rv = self._by_name[prop] = self._columns[resolve(prop)]
+            return rv
+
+    def lookup(self, cp, *props, default=None):
+        ''' Return a tuple of the values of each property for a codepoint.
+        '''
+        column = self.column
+        return tuple([column(p).get(cp, default) for p in props])
+
+    def record(self, cp):
+        ''' Return a dict of every property that has a value for a codepoint.
+        '''
+        rv = {}
+        for prop in self.properties():
+            value = self._columns[prop].get(cp, rv)
+            if value is not rv:
+                rv[prop] = value
+        return rv
+
+
+def _trim(quad, high_key, rest):
+    # Drop the keys up to high_key from the front of an items_ranges quad.
+    low_key, last_key, value, is_delta = quad
+    if high_key >= last_key:
+        return next(rest, None)
+    if is_delta:
+        value += high_key + 1 - low_key
+    return high_key + 1, last_key, value, is_delta
+
+
+def _segments(left, right):
+    ''' Cut two iterators of items_ranges quads at each other's edges.
+
+        Yield (low_key, high_key, left_quad, right_quad), where each quad
+        starts at low_key and covers the segment, or is None.
+    '''
+    a = next(left, None)
+    b = next(right, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a[0] < b[0]):
+            high_key = a[1] if b is None else min(a[1], b[0] - 1)
+            yield a[0], high_key, a, None
+            a = _trim(a, high_key, left)
+        elif a is None or b[0] < a[0]:
+            high_key = b[1] if a is None else min(b[1], a[0] - 1)
+            yield b[0], high_key, None, b
+            b = _trim(b, high_key, right)
+        else:
+            high_key = min(a[1], b[1])
+            yield a[0], high_key, a, b
+            a = _trim(a, high_key, left)
+            b = _trim(b, high_key, right)
+
+
+def _diff_ranges(old, new):
+    ''' Yield (low_key, high_key, value) triples for where `new` differs
+        from `old`; keys that are only in `old` get _MISSING.
+
+        Both are AutoMaps (or None, for no column).
+    '''
+    old = iter(old.items_ranges() if old is not None else ())
+    new = iter(new.items_ranges() if new is not None else ())
+    for low_key, high_key, a, b in _segments(old, new):
+        if b is None:
+            yield low_key, high_key, _MISSING
+        elif a is not None and a[2] == b[2] and (a[3] == b[3] or low_key == high_key):
+            continue
+        elif b[3]:
+            # Sequential values; the delta map finds the runs again.
+            value = b[2]
+            for key in range(low_key, high_key + 1):
+                yield key, key, value + (key - low_key)
+        else:
+            yield low_key, high_key, b[2]
+
+
+def _directory_version(ucd):
+    return _schema.get_schema_info(os.path.join(ucd, 'ReadMe.txt'))[2]
+
+
+class VersionedDatabase:
+    ''' Per-codepoint properties of several Unicode versions.
+
+        The newest version is kept whole, as the base. Every other version
+        only keeps, for each property, an AutoMap of the ranges where its
+        values differ from the base's.
+    '''
+    def __init__(self, base, deltas):
+        self.base = base
+        self._deltas = deltas
+        self._properties = set(base._columns)
+        for columns in deltas.values():
+            self._properties.update(columns)
+
+    @classmethod
+    def from_databases(cls, databases, *, backend='sorted'):
+        ''' Build from an iterable of Databases, newest first.
+
+            Each one is diffed as soon as it is produced, so a generator
+            only needs the base and one other version in memory at once.
+        '''
+        mem = importlib.import_module('uni.mem.' + backend)
+        databases = iter(databases)
+        base = next(databases, None)
+        if base is None or base.version is None:
+            raise ValueError('no base version')
+        deltas = {}
+        for db in databases:
+            if db.version is None or not db.version < base.version or db.version in deltas:
+                raise ValueError('versions must be given newest first, without repeats: %r' % (db.version,))
+            columns = deltas[db.version] = {}
+            for prop in set(base._columns) | set(db._columns):
+                triples = _diff_ranges(base._columns.get(prop), db._columns.get(prop))
+                delta = mem.AutoMap.from_sorted_ranges(triples, packed=True)
+                if len(delta):
+                    columns[prop] = delta
+        return cls(base, deltas)
+
+    @classmethod
+    def from_directories(cls, dirs, **kwargs):
+        ''' Load the property files under each directory (e.g. `9.0.0/ucd`).
+
+            Directories are loaded newest first, one at a time.
+        '''
+        dirs = sorted(dirs, key=_directory_version, reverse=True)
+        databases = (Database.from_directory(ucd, **kwargs) for ucd in dirs)
+        return cls.from_databases(databases, backend=kwargs.get('backend', 'sorted'))
+
+    def versions(self):
+        ''' Return every version, oldest first.
+        '''
+        return sorted([self.base.version] + list(self._deltas))
+
+    def properties(self):
+        ''' Return the properties that have a column in any version.
+        '''
+        return sorted(self._properties, key=operator.attrgetter('__name__'))
+
+    def delta(self, prop, version):
+        ''' Return the AutoMap of where a version differs from the base,
+            or None if it does not.
+        '''
+        if isinstance(version, str):
+            version = versioning.parse(version)
+        if version == self.base.version:
+            return None
+        return self._deltas[version].get(resolve(prop))
+
+    def lookup(self, cp, prop, version, default=None):
+        ''' Return the value of a property for a codepoint in a version.
+
+            Properties that the version does not have give `default`.
+        '''
+        if isinstance(version, str):
+            version = versioning.parse(version)
+        prop = resolve(prop)
+        if prop not in self._properties:
+            raise KeyError(prop)
+        if version != self.base.version:
+            delta = self._deltas[version].get(prop)
+            if delta is not None:
+                value = delta.get(cp, _UNCHANGED)
+                if value is not _UNCHANGED:
+                    return default if value is _MISSING else value
+        column = self.base._columns.get(prop)
+        if column is None:
+            return default
+        return column.get(cp, default)
+
+
+def _parse_codepoint(s):
+    if s[:2].upper() == 'U+':
+        s = s[2:]
+    return int(s, 16)
+
+
+def main(args=None, exe=None):
+    import sys
+    if args is None:
+        args = sys.argv[1:]
+    if exe is None:
+        exe = sys.argv[0]
+    kwargs = {}
+    while args:
+        if args[0].startswith('--backend='):
+            kwargs['backend'] = args[0][len('--backend='):]
+        elif args[0].startswith('--cache='):
+            kwargs['cache_dir'] = args[0][len('--cache='):]
+        elif args[0].startswith('--jobs='):
+            kwargs['jobs'] = int(args[0][len('--jobs='):]) or None
+        else:
+            break
+        del args[0]
+    if len(args) < 2 or any([a.startswith('-') for a in args]):
+        sys.exit('Usage: %s [--backend=sorted] [--cache=DIR] [--jobs=N (0 for all cores)] ucd-dir U+XXXX [property ...]' % exe) # pragma: no cover
+    db = Database.from_directory(args[0], **kwargs)
+    cp = _parse_codepoint(args[1])
+    props = args[2:]
+    if props:
+        for p, value in zip(props, db.lookup(cp, *props)):
+            print('%s: %r' % (p, value))
+    else:
+        for p, value in db.record(cp).items():
+            print('%s: %r' % (p.__name__, value))
+
+
+if __name__ == '__main__':
+    main()
@@ -99,6 +99,8 @@
 #
 # 00:
 
+from array import array
+
 
 def parent(n):
     assert n is not None
@@ -232,16 +234,62 @@ def iter_order_backward(arr):
         yield arr[i]
 
 
+def order_index(n, sz):
+    ''' Return the sorted index of the element that belongs at n.
+
+        In a perfect tree of height h, node n at depth d and offset p is
+        element (2p+1) * 2**(h-d) - 1; but every missing node on the last
+        row before it shifts it back by one.
+    '''
+    assert 0 <= n < sz
+    height = sz.bit_length() - 1
+    last_row = sz - (1 << height) + 1
+    depth = (n + 1).bit_length() - 1
+    rv = ((2 * (n + 1 - (1 << depth)) + 1) << (height - depth)) - 1
+    missing = (rv + 1) // 2 - last_row
+    if missing > 0:
+        rv -= missing
+    return rv
+
+
 def freeze(arr):
-    ''' Return a CFBS-ordered copy of arr.
+    ''' Reorder arr into CFBS order, in place if it is a list or array.
 
-        We're *allowed* to munge arr in place, but I haven't figured out how.
+        This follows each cycle of the permutation, so the only extra
+        memory is one byte per element to remember which are done.
     '''
-    arr = make_order(arr)
+    if not isinstance(arr, (list, array)):
+        arr = list(arr)
+    sz = len(arr)
+    if sz < 2:
+        return arr
+    # Same as order_index, but inlined.
+    height = sz.bit_length() - 1
+    last_row = sz - (1 << height) + 1
+    done = bytearray(sz)
+    for start in range(sz):
+        if done[start]:
+            continue
+        tmp = arr[start]
+        n = start
+        while True:
+            done[n] = 1
+            depth = (n + 1).bit_length() - 1
+            src = ((2 * (n + 1 - (1 << depth)) + 1) << (height - depth)) - 1
+            missing = (src + 1) // 2 - last_row
+            if missing > 0:
+                src -= missing
+            if src == start:
+                arr[n] = tmp
+                break
+            arr[n] = arr[src]
+            n = src
     return arr
 
 
 def _do_search(arr, item):
+    ''' Reference version of search, in terms of the tree helpers.
+    '''
     len_arr = len(arr)
     if not len_arr:
         return None
@@ -264,11 +312,19 @@ def _do_search(arr, item):
 
 def search(arr, item):
     ''' Return the index where the item might be.
+
+        Rather than climbing back up with predecessor() after falling off
+        a left edge, remember the last node that was not greater than the
+        item on the way down; that is always the answer.
     '''
-    rv = _do_search(arr, item)
-    if rv is None:
-        rv = -1
+    len_arr = len(arr)
+    rv = -1
+    n = 0
+    while n < len_arr:
+        if item < arr[n]:
+            n = n * 2 + 1
+        else:
+            rv = n
+            n = n * 2 + 2
     assert rv == -1 or arr[rv] <= item, rv
-    # Note: successor(-1, i) == first(i), except when i == 0
-    assert len(arr) == 0 or successor(rv, len(arr)) is None or item < arr[successor(rv, len(arr))], rv
     return rv
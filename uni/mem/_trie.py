@@ -0,0 +1,157 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from array import array
+import bisect
+import itertools
+import weakref
+
+
+# Two-stage table:
+#
+# The key space (codepoints) is cut into blocks of BLOCK_SIZE. For each block
+# we store the index of the last key *before* the block (`bases`), and an
+# offset into `leaves`, which holds, for each position in the block, how many
+# keys are in the block up to and including that position.
+#
+# Leaves are deduplicated, so every block without any keys shares leaf 0,
+# and blocks with the same pattern of keys share a leaf regardless of where
+# they are. Everything after the block of the last key is handled without
+# any table at all.
+#
+# Only arrays of (strictly increasing) codepoints get a table; for anything
+# else, this behaves exactly like _sorted.
+#
+# Tables are built lazily since values get frozen too. Packed arrays stay
+# packed. The memoryviews that uni.mem.sorted.load() returns can't carry a
+# table, so theirs are kept here by id() until they are freed.
+
+BLOCK_SHIFT = 8
+BLOCK_SIZE = 1 << BLOCK_SHIFT
+BLOCK_MASK = BLOCK_SIZE - 1
+MAX_KEY = 0x10FFFF
+
+
+def iter_forward(sz):
+    return range(sz)
+
+
+_tables = {}
+
+
+class Frozen(list):
+    ''' A sorted list, with a lookup table built on first search.
+    '''
+    __slots__ = ('table',)
+
+    def __init__(self, arr):
+        super().__init__(arr)
+        self.table = Ellipsis
+
+
+class FrozenArray(array):
+    ''' Same as Frozen, for a packed array.
+    '''
+    __slots__ = ('table',)
+
+    def __new__(cls, arr):
+        self = super().__new__(cls, arr.typecode, arr)
+        self.table = Ellipsis
+        return self
+
+
+def make_table(arr):
+    ''' Return (limit, bases, offsets, leaves), or None if not applicable.
+    '''
+    sz = len(arr)
+    if not sz:
+        return None
+    prev = -1
+    for key in arr:
+        if type(key) is not int or not prev < key <= MAX_KEY:
+            return None
+        prev = key
+    num_blocks = (arr[-1] >> BLOCK_SHIFT) + 1
+    bases = array('i')
+    offsets = array('I')
+    leaves = array('H', bytes(2 * BLOCK_SIZE))
+    seen = {leaves.tobytes(): 0}
+    idx = 0
+    for block in range(num_blocks):
+        start = block << BLOCK_SHIFT
+        end = bisect.bisect_left(arr, start + BLOCK_SIZE, idx)
+        bases.append(idx - 1)
+        if idx == end:
+            offsets.append(0)
+            continue
+        marks = bytearray(BLOCK_SIZE)
+        for key in itertools.islice(arr, idx, end):
+            marks[key - start] = 1
+        leaf = array('H', itertools.accumulate(marks)).tobytes()
+        offset = seen.get(leaf)
+        if offset is None:
+            offset = seen[leaf] = len(leaves)
+            leaves.frombytes(leaf)
+        offsets.append(offset)
+        idx = end
+    return num_blocks << BLOCK_SHIFT, bases, offsets, leaves
+
+
+def freeze(arr):
+    ''' Return a copy of arr that knows how to build a lookup table.
+
+        Packed arrays stay packed, and memoryviews are returned as is.
+    '''
+    if isinstance(arr, memoryview):
+        return arr
+    if isinstance(arr, array):
+        return FrozenArray(arr)
+    return Frozen(arr)
+
+
+def _cache_table(arr):
+    key = id(arr)
+    table = _tables[key] = make_table(arr)
+    weakref.finalize(arr, _tables.pop, key, None)
+    return table
+
+
+def search(arr, item):
+    ''' Return the index where the item might be.
+    '''
+    if type(item) is int and item >= 0:
+        t = type(arr)
+        if t is Frozen or t is FrozenArray:
+            table = arr.table
+            if table is Ellipsis:
+                table = arr.table = make_table(arr)
+        elif t is memoryview:
+            table = _tables.get(id(arr), Ellipsis)
+            if table is Ellipsis:
+                table = _cache_table(arr)
+        else:
+            table = None
+        if table is not None:
+            limit, bases, offsets, leaves = table
+            if item >= limit:
+                return len(arr) - 1
+            block = item >> BLOCK_SHIFT
+            rv = bases[block] + leaves[offsets[block] + (item & BLOCK_MASK)]
+            assert rv == -1 or arr[rv] <= item
+            return rv
+    rv = bisect.bisect_right(arr, item) - 1
+    assert rv == -1 or arr[rv] <= item
+    assert rv+1 == len(arr) or item < arr[rv+1]
+    return rv
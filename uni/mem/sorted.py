@@ -13,13 +13,40 @@
 #
 #   You should have received a copy of the GNU Lesser General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from array import array
 from collections.abc import Set, Mapping
+import heapq
 import importlib
+import itertools
+import mmap
+import operator
+import pickle
+import struct
+import sys
 
 _algo = importlib.import_module(__name__.replace('.mem.', '.mem._'))
 from .._util import ErrorBool, MinIter
 
 
+def _as_keys(keys):
+    if isinstance(keys, str):
+        return [ord(c) for c in keys]
+    if isinstance(keys, array) and keys.typecode in ('u', 'w'):
+        # memoryview doesn't support these, but they hold characters anyway.
+        return [ord(c) for c in keys]
+    try:
+        return memoryview(keys).tolist()
+    except TypeError:
+        return list(keys)
+
+
+def _lookup_many(lookup_sorted, keys, default):
+    keys = _as_keys(keys)
+    distinct = sorted(set(keys))
+    table = dict(zip(distinct, lookup_sorted(distinct, default)))
+    return [table[k] for k in keys]
+
+
 def adjacent(left, right, *, step=1):
     try:
         check = left + step
@@ -28,6 +55,187 @@ def adjacent(left, right, *, step=1):
     return check == right
 
 
+def _adjacent_value(left, right, *, step=1):
+    # Same as adjacent(), but cheap for the common cases: ints, and values
+    # (like enums) that cannot be added to at all.
+    if type(left) is int:
+        return left + step == right
+    if not hasattr(type(left), '__add__'):
+        return False
+    return adjacent(left, right, step=step)
+
+
+def _is_sorted_ranges(low_keys, high_keys):
+    # One pass in C, rather than an assert per element.
+    return all(map(operator.le, low_keys, high_keys)) and all(map(operator.lt, high_keys, itertools.islice(low_keys, 1, None)))
+
+
+def _count_ranges(low_keys, high_keys):
+    return sum(high_keys) - sum(low_keys) + len(low_keys)
+
+
+# AutoSet and AutoMap keep a merged index of the low keys of all their
+# partitions, so that a lookup needs only one search. Since the partitions
+# are disjoint, the nearest low key names the only range that might hold
+# the item. Each tag holds the index into that partition, shifted left
+# past the partition number.
+_SIMPLE = 0
+_COMPRESSED = 1
+_SEQUENTIAL = 2
+_TAG_BITS = 2
+_TAG_MASK = (1 << _TAG_BITS) - 1
+
+
+_low_key = operator.itemgetter(0)
+
+
+def _expand_ranges(ranges):
+    # Keys need not be ints when ranges are singletons.
+    for low_key, high_key in ranges:
+        if low_key == high_key:
+            yield low_key
+        else:
+            yield from range(low_key, high_key + 1)
+
+
+def _index_entries(keys, part):
+    for idx in _algo.iter_forward(len(keys)):
+        yield keys[idx], idx << _TAG_BITS | part
+
+
+def _make_index(*partitions):
+    ''' Merge (frozen keys, partition number) pairs into (keys, tags).
+
+        Like the partitions' own keys, these are arrays where possible,
+        and are saved by `dump`.
+    '''
+    keys = []
+    tags = array('I')
+    for key, tag in heapq.merge(*[_index_entries(k, p) for k, p in partitions]):
+        keys.append(key)
+        tags.append(tag)
+    if _is_packable(keys):
+        keys = array('I', keys)
+    return _algo.freeze(keys), _algo.freeze(tags)
+
+
+# Set algebra on ranges. Each range contributes an edge where it starts
+# and one just past where it ends, so sweeping the merged edges of two
+# sets tells which of them each run of keys is in.
+_MAX_KEY = 0x10FFFF
+_UNION = frozenset([1, 2, 3])
+_INTERSECTION = frozenset([3])
+_DIFFERENCE = frozenset([1])
+_SYMMETRIC_DIFFERENCE = frozenset([1, 2])
+
+
+def _edges(ranges, bit):
+    for low_key, high_key in ranges:
+        yield low_key, bit
+        yield high_key + 1, bit
+
+
+def _combine_ranges(left, right, accept):
+    ''' Combine two ordered iterables of (low_key, high_key) ranges.
+
+        A key is kept if its state is in `accept`, where bit 1 of the
+        state means it is in `left` and bit 2 means it is in `right`.
+        Return a frozen RangeSet.
+    '''
+    low_keys = []
+    high_keys = []
+    state = 0
+    inside = False
+    for key, edges in itertools.groupby(MinIter(_edges(left, 1), _edges(right, 2), key=_low_key), key=_low_key):
+        for _, bit in edges:
+            state ^= bit
+        if (state in accept) != inside:
+            inside = not inside
+            if inside:
+                low_keys.append(key)
+            else:
+                high_keys.append(key - 1)
+    assert not inside
+    return RangeSet.from_arrays(low_keys, high_keys)
+
+
+def _iter_row_ranges(rows):
+    ''' Yield (low_key, high_key, value) for rows, in key order.
+
+        The first field of each row is a key or a (low_key, high_key)
+        pair, and the second (if any) is the value. Most UCD files list
+        their rows grouped by value, so the order is checked as rows come
+        in: each ordered run is kept in packed arrays, and the runs are
+        merged at the end. Overlapping rows are an error.
+    '''
+    runs = []
+    prev = None
+    for row in rows:
+        key = row[0]
+        low_key, high_key = key if isinstance(key, tuple) else (key, key)
+        if not low_key <= high_key:
+            raise ValueError('bad range in row: %r' % (row,))
+        if prev is None or not prev < low_key:
+            low_keys = array('I')
+            high_keys = array('I')
+            values = []
+            runs.append((low_keys, high_keys, values))
+        low_keys.append(low_key)
+        high_keys.append(high_key)
+        values.append(row[1] if len(row) > 1 else None)
+        prev = high_key
+    if len(runs) == 1:
+        yield from zip(*runs[0])
+        return
+    prev = None
+    for low_key, high_key, value in MinIter(*[zip(*run) for run in runs], key=_low_key):
+        if prev is not None and not prev < low_key:
+            raise ValueError('overlapping rows at %r' % ((low_key, high_key),))
+        yield low_key, high_key, value
+        prev = high_key
+
+
+class _RangeAlgebra:
+    ''' Set operations that work on ranges, not individual keys.
+
+        They apply when both operands are RangeSets or AutoSets of ints,
+        and always return a frozen RangeSet.
+    '''
+    __slots__ = ()
+
+    def _combine(self, other, accept):
+        if isinstance(other, _RangeAlgebra):
+            left = self._int_ranges()
+            right = other._int_ranges()
+            if left is not None and right is not None:
+                return _combine_ranges(left, right, accept)
+        return None
+
+    def __or__(self, other):
+        rv = self._combine(other, _UNION)
+        return super().__or__(other) if rv is None else rv
+
+    def __and__(self, other):
+        rv = self._combine(other, _INTERSECTION)
+        return super().__and__(other) if rv is None else rv
+
+    def __sub__(self, other):
+        rv = self._combine(other, _DIFFERENCE)
+        return super().__sub__(other) if rv is None else rv
+
+    def __xor__(self, other):
+        rv = self._combine(other, _SYMMETRIC_DIFFERENCE)
+        return super().__xor__(other) if rv is None else rv
+
+    def complement(self):
+        ''' Return the codepoints (0 through 0x10FFFF) not in this set.
+        '''
+        ranges = self._int_ranges()
+        if ranges is None:
+            raise TypeError('complement requires integer keys')
+        return _combine_ranges([(0, _MAX_KEY)], ranges, _DIFFERENCE)
+
+
 class SortedSet(Set):
     ''' Simple binary-search set.
     '''
@@ -36,12 +244,24 @@ class SortedSet(Set):
         self._keys = []
         self._frozen = False
         if iterable is not None:
-            iterable = sorted(iterable)
+            iterable = sorted(set(iterable))
             for key in iterable:
                 self._append(key)
             if freeze:
                 self._freeze()
 
+    @classmethod
+    def from_arrays(cls, keys, *, freeze=True):
+        ''' Build from strictly increasing keys, without sorting them.
+        '''
+        self = cls()
+        self._keys = list(keys)
+        self._len = len(self._keys)
+        assert _is_sorted_ranges(self._keys, self._keys)
+        if freeze:
+            self._freeze()
+        return self
+
     def _append(self, key):
         assert not self._frozen
         assert not self._len or self._keys[-1] < key
@@ -53,6 +273,11 @@ class SortedSet(Set):
         self._keys.pop()
         self._len -= 1
 
+    def _pack_keys(self):
+        # Switch an empty container to array('I') keys.
+        assert not self._frozen and not self._len
+        self._keys = array('I')
+
     def _freeze(self):
         assert not self._frozen
         self._frozen = True
@@ -95,7 +320,7 @@ class SortedSet(Set):
         return '%s(len=%d, keys=%r)' % (self.__class__.__qualname__, self._len, self._keys)
 
 
-class RangeSet(Set):
+class RangeSet(_RangeAlgebra, Set):
     ''' Compressed binary-search set.
     '''
     def __init__(self, iterable=None, *, freeze=True):
@@ -104,12 +329,51 @@ class RangeSet(Set):
         self._high_keys = []
         self._frozen = False
         if iterable is not None:
-            iterable = sorted(iterable)
+            iterable = sorted(set(iterable))
             for key in iterable:
                 self._append_range(key, key)
             if freeze:
                 self._freeze()
 
+    @classmethod
+    def from_sorted_ranges(cls, ranges, *, packed=False, freeze=True):
+        ''' Build from sorted, disjoint (low_key, high_key) pairs.
+
+            Adjacent ranges are merged, as with _append_range.
+
+            If `packed`, keys are stored as 32-bit unsigned ints.
+        '''
+        self = cls()
+        if packed:
+            self._pack_keys()
+        low_keys = self._low_keys
+        high_keys = self._high_keys
+        for low_key, high_key in ranges:
+            if high_keys and high_keys[-1] + 1 == low_key:
+                high_keys[-1] = high_key
+            else:
+                low_keys.append(low_key)
+                high_keys.append(high_key)
+        assert _is_sorted_ranges(low_keys, high_keys)
+        self._len = _count_ranges(low_keys, high_keys)
+        if freeze:
+            self._freeze()
+        return self
+
+    @classmethod
+    def from_arrays(cls, low_keys, high_keys, *, freeze=True):
+        return cls.from_sorted_ranges(zip(low_keys, high_keys), freeze=freeze)
+
+    @classmethod
+    def from_rows(cls, rows, *, freeze=True):
+        ''' Build from rows like those of `Schema.load`, keeping keys packed.
+
+            See _iter_row_ranges for what rows look like. Values (if any)
+            are ignored.
+        '''
+        ranges = ((low_key, high_key) for low_key, high_key, value in _iter_row_ranges(rows))
+        return cls.from_sorted_ranges(ranges, packed=True, freeze=freeze)
+
     def _append_range(self, low_key, high_key):
         assert not self._frozen
         assert not self._len or self._high_keys[-1] < low_key
@@ -121,6 +385,12 @@ class RangeSet(Set):
             self._high_keys.append(high_key)
         self._len += high_key - low_key + 1
 
+    def _pack_keys(self):
+        # Switch an empty container to array('I') keys.
+        assert not self._frozen and not self._len
+        self._low_keys = array('I')
+        self._high_keys = array('I')
+
     def _freeze(self):
         assert not self._frozen
         self._frozen = True
@@ -155,6 +425,14 @@ class RangeSet(Set):
         for idx in _algo.iter_forward(len(_low_keys)):
             yield (_low_keys[idx], _high_keys[idx])
 
+    def iter_ranges(self):
+        ''' Yield each (low_key, high_key) range, in order.
+        '''
+        return self._iter_tuples()
+
+    def _int_ranges(self):
+        return self._iter_tuples()
+
     def __iter__(self):
         for k1, k2 in self._iter_tuples():
             for k in range(k1, k2+1):
@@ -167,19 +445,68 @@ class RangeSet(Set):
         return '%s(len=%d, low_keys=%r, high_keys=%r)' % (self.__class__.__qualname__, self._len, self._low_keys, self._high_keys)
 
 
-class AutoSet(Set):
+class AutoSet(_RangeAlgebra, Set):
     ''' Multi-strategy binary-search set.
     '''
     def __init__(self, iterable=None, *, freeze=True):
         self._simple = SortedSet()
         self._compressed = RangeSet()
+        self._index = None
         if iterable is not None:
-            iterable = sorted(iterable)
+            iterable = sorted(set(iterable))
             for key in iterable:
                 self._append_range(key, key)
             if freeze:
                 self._freeze()
 
+    @classmethod
+    def from_sorted_ranges(cls, ranges, *, packed=False, freeze=True):
+        ''' Build from sorted, disjoint (low_key, high_key) pairs.
+
+            This gives the same partitions as calling _append_range for
+            each pair, but in one pass and without per-element checks.
+
+            If `packed`, keys are stored as 32-bit unsigned ints.
+        '''
+        self = cls()
+        if packed:
+            self._pack_keys()
+        keys = self._simple._keys
+        low_keys = self._compressed._low_keys
+        high_keys = self._compressed._high_keys
+        for low_key, high_key in ranges:
+            if keys and keys[-1] + 1 == low_key:
+                low_key = keys.pop()
+            elif low_key == high_key and not (high_keys and high_keys[-1] + 1 == low_key):
+                keys.append(low_key)
+                continue
+            if high_keys and high_keys[-1] + 1 == low_key:
+                high_keys[-1] = high_key
+            else:
+                low_keys.append(low_key)
+                high_keys.append(high_key)
+        assert _is_sorted_ranges(keys, keys)
+        assert _is_sorted_ranges(low_keys, high_keys)
+        self._simple._len = len(keys)
+        self._compressed._len = _count_ranges(low_keys, high_keys)
+        if freeze:
+            self._freeze()
+        return self
+
+    @classmethod
+    def from_arrays(cls, low_keys, high_keys, *, freeze=True):
+        return cls.from_sorted_ranges(zip(low_keys, high_keys), freeze=freeze)
+
+    @classmethod
+    def from_rows(cls, rows, *, freeze=True):
+        ''' Build from rows like those of `Schema.load`, keeping keys packed.
+
+            See _iter_row_ranges for what rows look like. Values (if any)
+            are ignored.
+        '''
+        ranges = ((low_key, high_key) for low_key, high_key, value in _iter_row_ranges(rows))
+        return cls.from_sorted_ranges(ranges, packed=True, freeze=freeze)
+
     def _append_range(self, low_key, high_key):
         assert not self._simple._len or self._simple._keys[-1] < low_key
         assert not self._compressed._len or self._compressed._high_keys[-1] < low_key
@@ -194,25 +521,65 @@ class AutoSet(Set):
             return
         self._simple._append(low_key)
 
+    def _pack_keys(self):
+        # Switch an empty container to array('I') keys.
+        self._simple._pack_keys()
+        self._compressed._pack_keys()
+
     def _freeze(self):
         self._simple._freeze()
         self._compressed._freeze()
+        self._index = None
 
     @classmethod
-    def _from_raw(cls, simple_raw, compressed_raw):
+    def _from_raw(cls, simple_raw, compressed_raw, index):
         self = cls.__new__(cls)
         self._simple = SortedSet._from_raw(*simple_raw)
         self._compressed = RangeSet._from_raw(*compressed_raw)
+        self._index = index
         return self
 
     def _to_raw(self):
-        return self._simple._to_raw(), self._compressed._to_raw()
+        return self._simple._to_raw(), self._compressed._to_raw(), self._get_index()
+
+    def _get_index(self):
+        # Built on first lookup, unless it was loaded along with the rest.
+        if self._index is not None:
+            return self._index
+        assert self._simple._frozen or not len(self)
+        index = _make_index((self._simple._keys, _SIMPLE), (self._compressed._low_keys, _COMPRESSED))
+        if self._simple._frozen:
+            self._index = index
+        return index
 
     def __contains__(self, item):
-        return item in self._simple or item in self._compressed
+        index = self._index
+        if index is None:
+            index = self._get_index()
+        keys, tags = index
+        idx = _algo.search(keys, item)
+        if idx == -1:
+            return False
+        assert keys[idx] <= item
+        tag = tags[idx]
+        if tag & _TAG_MASK == _SIMPLE:
+            return item == keys[idx]
+        return item <= self._compressed._high_keys[tag >> _TAG_BITS]
+
+    def iter_ranges(self):
+        ''' Yield each (low_key, high_key) range, in order.
+        '''
+        simple = ((k, k) for k, in self._simple._iter_tuples())
+        return MinIter(simple, self._compressed._iter_tuples(), key=_low_key)
+
+    def _int_ranges(self):
+        # Only the simple keys can be something else.
+        if not all([type(k) is int for k in self._simple._keys]):
+            return None
+        return self.iter_ranges()
 
     def __iter__(self):
-        return MinIter(self._simple, self._compressed)
+        return _expand_ranges(self.iter_ranges())
 
     def __len__(self):
         return self._simple._len + self._compressed._len
@@ -238,6 +605,20 @@ class SortedMap(Mapping):
             if freeze:
                 self._freeze()
 
+    @classmethod
+    def from_arrays(cls, keys, values, *, freeze=True):
+        ''' Build from strictly increasing keys, without sorting them.
+        '''
+        self = cls()
+        self._keys = list(keys)
+        self._values = list(values)
+        self._len = len(self._keys)
+        assert len(self._values) == self._len
+        assert _is_sorted_ranges(self._keys, self._keys)
+        if freeze:
+            self._freeze()
+        return self
+
     def _append(self, key, value):
         assert not self._frozen
         assert not self._len or self._keys[-1] < key
@@ -251,6 +632,11 @@ class SortedMap(Mapping):
         self._values.pop()
         self._len -= 1
 
+    def _pack_keys(self):
+        # Switch an empty container to array('I') keys.
+        assert not self._frozen and not self._len
+        self._keys = array('I')
+
     def _freeze(self):
         assert not self._frozen
         self._frozen = True
@@ -279,6 +665,27 @@ class SortedMap(Mapping):
                 return self._values[idx]
         raise KeyError(item)
 
+    def lookup_many(self, keys, default=None):
+        ''' Look up many keys at once, returning a list in the same order.
+
+            `keys` may be a str (looked up by codepoint), an array, or any
+            other buffer or iterable. Missing keys give `default`.
+        '''
+        return _lookup_many(self._lookup_sorted, keys, default)
+
+    def _lookup_sorted(self, items, default):
+        assert self._frozen or not self._len
+        _keys = self._keys
+        _values = self._values
+        rv = []
+        for item in items:
+            idx = _algo.search(_keys, item)
+            if idx != -1 and item == _keys[idx]:
+                rv.append(_values[idx])
+            else:
+                rv.append(default)
+        return rv
+
     def _iter_tuples(self):
         _keys = self._keys
         _values = self._values
@@ -314,6 +721,46 @@ class RangeMap(Mapping):
             if freeze:
                 self._freeze()
 
+    @classmethod
+    def from_sorted_ranges(cls, ranges, *, packed=False, freeze=True):
+        ''' Build from sorted, disjoint (low_key, high_key, value) triples.
+
+            Adjacent ranges with equal values are merged, as with
+            _append_range.
+
+            If `packed`, keys are stored as 32-bit unsigned ints.
+        '''
+        self = cls()
+        if packed:
+            self._pack_keys()
+        low_keys = self._low_keys
+        high_keys = self._high_keys
+        values = self._values
+        for low_key, high_key, value in ranges:
+            if high_keys and high_keys[-1] + 1 == low_key and values[-1] == value:
+                high_keys[-1] = high_key
+            else:
+                low_keys.append(low_key)
+                high_keys.append(high_key)
+                values.append(value)
+        assert _is_sorted_ranges(low_keys, high_keys)
+        self._len = _count_ranges(low_keys, high_keys)
+        if freeze:
+            self._freeze()
+        return self
+
+    @classmethod
+    def from_arrays(cls, low_keys, high_keys, values, *, freeze=True):
+        return cls.from_sorted_ranges(zip(low_keys, high_keys, values), freeze=freeze)
+
+    @classmethod
+    def from_rows(cls, rows, *, freeze=True):
+        ''' Build from rows like those of `Schema.load`, keeping keys packed.
+
+            See _iter_row_ranges for what rows look like.
+        '''
+        return cls.from_sorted_ranges(_iter_row_ranges(rows), packed=True, freeze=freeze)
+
     def _append_range(self, low_key, high_key, value):
         assert not self._frozen
         assert not self._len or self._high_keys[-1] < low_key
@@ -333,6 +780,12 @@ class RangeMap(Mapping):
         self._values.pop()
         self._len -= high_key - low_key + 1
 
+    def _pack_keys(self):
+        # Switch an empty container to array('I') keys.
+        assert not self._frozen and not self._len
+        self._low_keys = array('I')
+        self._high_keys = array('I')
+
     def _freeze(self):
         assert not self._frozen
         self._frozen = True
@@ -363,6 +816,34 @@ class RangeMap(Mapping):
                 return self._values[idx]
         raise KeyError(item)
 
+    def lookup_many(self, keys, default=None):
+        ''' Look up many keys at once, returning a list in the same order.
+
+            `keys` may be a str (looked up by codepoint), an array, or any
+            other buffer or iterable. Missing keys give `default`.
+        '''
+        return _lookup_many(self._lookup_sorted, keys, default)
+
+    def _lookup_sorted(self, items, default):
+        # Since the items are sorted, consecutive items often share a range.
+        assert self._frozen or not self._len
+        if not self._len:
+            return [default] * len(items)
+        _low_keys = self._low_keys
+        _high_keys = self._high_keys
+        _values = self._values
+        rv = []
+        low, high, value = 1, 0, default
+        for item in items:
+            if not low <= item <= high:
+                idx = _algo.search(_low_keys, item)
+                if idx == -1 or _high_keys[idx] < item:
+                    rv.append(default)
+                    continue
+                low, high, value = _low_keys[idx], _high_keys[idx], _values[idx]
+            rv.append(value)
+        return rv
+
     def _iter_tuples(self):
         _low_keys = self._low_keys
         _high_keys = self._high_keys
@@ -370,6 +851,19 @@ class RangeMap(Mapping):
         for idx in _algo.iter_forward(len(self._low_keys)):
             yield (_low_keys[idx], _high_keys[idx], _values[idx])
 
+    def items_ranges(self):
+        ''' Yield each (low_key, high_key, value) range, in order.
+        '''
+        return self._iter_tuples()
+
+    def iter_ranges(self):
+        ''' Yield each (low_key, high_key) range, in order.
+
+            Adjacent ranges with different values are not merged.
+        '''
+        for k1, k2, v in self._iter_tuples():
+            yield k1, k2
+
     def __iter__(self):
         for k1, k2, v in self._iter_tuples():
             for k in range(k1, k2+1):
@@ -400,6 +894,47 @@ class DeltaMap(Mapping):
             if freeze:
                 self._freeze()
 
+    @classmethod
+    def from_sorted_ranges(cls, ranges, *, packed=False, freeze=True):
+        ''' Build from sorted, disjoint (low_key, high_key, value) triples.
+
+            Each value is that of low_key. Ranges that continue the
+            sequence are merged, as with _append_range.
+
+            If `packed`, keys are stored as 32-bit unsigned ints.
+        '''
+        self = cls()
+        if packed:
+            self._pack_keys()
+        low_keys = self._low_keys
+        high_keys = self._high_keys
+        values = self._values
+        for low_key, high_key, value in ranges:
+            if high_keys and high_keys[-1] + 1 == low_key and values[-1] + (low_key - low_keys[-1]) == value:
+                high_keys[-1] = high_key
+            else:
+                low_keys.append(low_key)
+                high_keys.append(high_key)
+                values.append(value)
+        assert _is_sorted_ranges(low_keys, high_keys)
+        self._len = _count_ranges(low_keys, high_keys)
+        if freeze:
+            self._freeze()
+        return self
+
+    @classmethod
+    def from_arrays(cls, low_keys, high_keys, values, *, freeze=True):
+        return cls.from_sorted_ranges(zip(low_keys, high_keys, values), freeze=freeze)
+
+    @classmethod
+    def from_rows(cls, rows, *, freeze=True):
+        ''' Build from rows like those of `Schema.load`, keeping keys packed.
+
+            See _iter_row_ranges for what rows look like. Each value is
+            that of the row's low key.
+        '''
+        return cls.from_sorted_ranges(_iter_row_ranges(rows), packed=True, freeze=freeze)
+
     def _append_range(self, low_key, high_key, value):
         assert not self._frozen
         assert not self._len or self._high_keys[-1] < low_key
@@ -419,6 +954,12 @@ class DeltaMap(Mapping):
         self._values.pop()
         self._len -= high_key - low_key + 1
 
+    def _pack_keys(self):
+        # Switch an empty container to array('I') keys.
+        assert not self._frozen and not self._len
+        self._low_keys = array('I')
+        self._high_keys = array('I')
+
     def _freeze(self):
         assert not self._frozen
         self._frozen = True
@@ -449,6 +990,34 @@ class DeltaMap(Mapping):
                 return self._values[idx] + (item - self._low_keys[idx])
         raise KeyError(item)
 
+    def lookup_many(self, keys, default=None):
+        ''' Look up many keys at once, returning a list in the same order.
+
+            `keys` may be a str (looked up by codepoint), an array, or any
+            other buffer or iterable. Missing keys give `default`.
+        '''
+        return _lookup_many(self._lookup_sorted, keys, default)
+
+    def _lookup_sorted(self, items, default):
+        # Since the items are sorted, consecutive items often share a range.
+        assert self._frozen or not self._len
+        if not self._len:
+            return [default] * len(items)
+        _low_keys = self._low_keys
+        _high_keys = self._high_keys
+        _values = self._values
+        rv = []
+        low, high, value = 1, 0, default
+        for item in items:
+            if not low <= item <= high:
+                idx = _algo.search(_low_keys, item)
+                if idx == -1 or _high_keys[idx] < item:
+                    rv.append(default)
+                    continue
+                low, high, value = _low_keys[idx], _high_keys[idx], _values[idx]
+            rv.append(value + (item - low))
+        return rv
+
     def _iter_tuples(self):
         _low_keys = self._low_keys
         _high_keys = self._high_keys
@@ -456,6 +1025,22 @@ class DeltaMap(Mapping):
         for idx in _algo.iter_forward(len(self._low_keys)):
             yield (_low_keys[idx], _high_keys[idx], _values[idx])
 
+    def items_ranges(self):
+        ''' Yield each (low_key, high_key, value) range, in order.
+
+            The value is that of low_key; it increases by one for each
+            following key.
+        '''
+        return self._iter_tuples()
+
+    def iter_ranges(self):
+        ''' Yield each (low_key, high_key) range, in order.
+
+            Adjacent ranges are not merged.
+        '''
+        for k1, k2, v in self._iter_tuples():
+            yield k1, k2
+
     def __iter__(self):
         for k1, k2, v in self._iter_tuples():
             for k in range(k1, k2+1):
@@ -475,6 +1060,7 @@ class AutoMap(Mapping):
         self._simple = SortedMap()
         self._compressed = RangeMap()
         self._sequential = DeltaMap()
+        self._index = None
         if iterable is not None:
             if isinstance(iterable, Mapping):
                 iterable = iterable.items()
@@ -484,6 +1070,104 @@ class AutoMap(Mapping):
             if freeze:
                 self._freeze()
 
+    @classmethod
+    def from_sorted_ranges(cls, ranges, *, delta=False, packed=False, freeze=True):
+        ''' Build from sorted, disjoint (low_key, high_key, value) triples.
+
+            Every key of a range maps to its value or, if `delta`, to
+            `value + (key - low_key)`. This gives the same partitions as
+            calling _append_range for each triple, but in one pass and
+            without per-element checks.
+
+            If `packed`, keys are stored as 32-bit unsigned ints.
+        '''
+        self = cls()
+        if packed:
+            self._pack_keys()
+        keys = self._simple._keys
+        key_values = self._simple._values
+        c_low_keys = self._compressed._low_keys
+        c_high_keys = self._compressed._high_keys
+        c_values = self._compressed._values
+        s_low_keys = self._sequential._low_keys
+        s_high_keys = self._sequential._high_keys
+        s_values = self._sequential._values
+
+        def append_compressed(low_key, high_key, value):
+            if c_high_keys and c_high_keys[-1] + 1 == low_key and c_values[-1] == value:
+                c_high_keys[-1] = high_key
+            else:
+                c_low_keys.append(low_key)
+                c_high_keys.append(high_key)
+                c_values.append(value)
+
+        def append_sequential(low_key, high_key, value):
+            if s_high_keys and s_high_keys[-1] + 1 == low_key and s_values[-1] + (low_key - s_low_keys[-1]) == value:
+                s_high_keys[-1] = high_key
+            else:
+                s_low_keys.append(low_key)
+                s_high_keys.append(high_key)
+                s_values.append(value)
+
+        # This is _append_range with the sub-maps inlined; see there.
+        for low_key, high_key, value in ranges:
+            single = low_key == high_key
+            if keys and keys[-1] + 1 == low_key:
+                if (single or not delta) and key_values[-1] == value:
+                    low_key = keys.pop()
+                    key_values.pop()
+                    append_compressed(low_key, high_key, value)
+                    continue
+                if (single or delta) and _adjacent_value(key_values[-1], value):
+                    low_key = keys.pop()
+                    value = key_values.pop()
+                    append_sequential(low_key, high_key, value)
+                    continue
+            if single:
+                if c_high_keys and c_low_keys[-1] + 1 == c_high_keys[-1]:
+                    if c_high_keys[-1] + 1 == low_key and _adjacent_value(c_values[-1], value):
+                        keys.append(c_low_keys.pop())
+                        key_values.append(c_values[-1])
+                        append_sequential(c_high_keys.pop(), low_key, c_values.pop())
+                        continue
+                if s_high_keys and s_low_keys[-1] + 1 == s_high_keys[-1]:
+                    if s_high_keys[-1] + 1 == low_key and _adjacent_value(s_values[-1], value):
+                        keys.append(s_low_keys.pop())
+                        key_values.append(s_values.pop())
+                        append_compressed(s_high_keys.pop(), low_key, value)
+                        continue
+            if single or not delta:
+                if not single or (c_high_keys and c_high_keys[-1] + 1 == low_key and c_values[-1] == value):
+                    append_compressed(low_key, high_key, value)
+                    continue
+            if single or delta:
+                if not single or (s_high_keys and s_high_keys[-1] + 1 == low_key and _adjacent_value(s_values[-1], value, step=(low_key - s_low_keys[-1]))):
+                    append_sequential(low_key, high_key, value)
+                    continue
+            keys.append(low_key)
+            key_values.append(value)
+        assert _is_sorted_ranges(keys, keys)
+        assert _is_sorted_ranges(c_low_keys, c_high_keys)
+        assert _is_sorted_ranges(s_low_keys, s_high_keys)
+        self._simple._len = len(keys)
+        self._compressed._len = _count_ranges(c_low_keys, c_high_keys)
+        self._sequential._len = _count_ranges(s_low_keys, s_high_keys)
+        if freeze:
+            self._freeze()
+        return self
+
+    @classmethod
+    def from_arrays(cls, low_keys, high_keys, values, *, delta=False, freeze=True):
+        return cls.from_sorted_ranges(zip(low_keys, high_keys, values), delta=delta, freeze=freeze)
+
+    @classmethod
+    def from_rows(cls, rows, *, delta=False, freeze=True):
+        ''' Build from rows like those of `Schema.load`, keeping keys packed.
+
+            See _iter_row_ranges for what rows look like.
+        '''
+        return cls.from_sorted_ranges(_iter_row_ranges(rows), delta=delta, packed=True, freeze=freeze)
+
     def _append_range(self, low_key, high_key, value, is_delta):
         assert not self._simple._len or self._simple._keys[-1] < low_key
         assert not self._compressed._len or self._compressed._high_keys[-1] < low_key
@@ -528,38 +1212,212 @@ class AutoMap(Mapping):
         assert low_key == high_key
         self._simple._append(low_key, value)
 
+    def _pack_keys(self):
+        # Switch an empty container to array('I') keys.
+        self._simple._pack_keys()
+        self._compressed._pack_keys()
+        self._sequential._pack_keys()
+
     def _freeze(self):
         self._simple._freeze()
         self._compressed._freeze()
         self._sequential._freeze()
+        self._index = None
 
     @classmethod
-    def _from_raw(cls, simple_raw, compressed_raw, sequential_raw):
+    def _from_raw(cls, simple_raw, compressed_raw, sequential_raw, index):
         self = cls.__new__(cls)
         self._simple = SortedMap._from_raw(*simple_raw)
         self._compressed = RangeMap._from_raw(*compressed_raw)
         self._sequential = DeltaMap._from_raw(*sequential_raw)
+        self._index = index
         return self
 
     def _to_raw(self):
-        return self._simple._to_raw(), self._compressed._to_raw(), self._sequential._to_raw()
+        return self._simple._to_raw(), self._compressed._to_raw(), self._sequential._to_raw(), self._get_index()
+
+    def _get_index(self):
+        # Built on first lookup, unless it was loaded along with the rest.
+        if self._index is not None:
+            return self._index
+        assert self._simple._frozen or not len(self)
+        index = _make_index((self._simple._keys, _SIMPLE), (self._compressed._low_keys, _COMPRESSED), (self._sequential._low_keys, _SEQUENTIAL))
+        if self._simple._frozen:
+            self._index = index
+        return index
 
     def __getitem__(self, item):
-        try:
-            return self._simple[item]
-        except KeyError:
-            pass
-        try:
-            return self._compressed[item]
-        except KeyError:
-            pass
-        return self._sequential[item]
+        index = self._index
+        if index is None:
+            index = self._get_index()
+        keys, tags = index
+        idx = _algo.search(keys, item)
+        if idx != -1:
+            assert keys[idx] <= item
+            tag = tags[idx]
+            part = tag & _TAG_MASK
+            tag >>= _TAG_BITS
+            if part == _SIMPLE:
+                if item == keys[idx]:
+                    return self._simple._values[tag]
+            elif part == _COMPRESSED:
+                if item <= self._compressed._high_keys[tag]:
+                    return self._compressed._values[tag]
+            elif item <= self._sequential._high_keys[tag]:
+                return self._sequential._values[tag] + (item - keys[idx])
+        raise KeyError(item)
+
+    def lookup_many(self, keys, default=None):
+        ''' Look up many keys at once, returning a list in the same order.
+
+            `keys` may be a str (looked up by codepoint), an array, or any
+            other buffer or iterable. Missing keys give `default`.
+        '''
+        return _lookup_many(self._lookup_sorted, keys, default)
+
+    def _lookup_sorted(self, items, default):
+        # Since the items are sorted, consecutive items often share a range.
+        index = self._index
+        if index is None:
+            index = self._get_index()
+        keys, tags = index
+        simple = self._simple
+        compressed = self._compressed
+        sequential = self._sequential
+        rv = []
+        low = high = None
+        for item in items:
+            if high is None or not low <= item <= high:
+                idx = _algo.search(keys, item)
+                if idx == -1:
+                    rv.append(default)
+                    continue
+                tag = tags[idx]
+                part = tag & _TAG_MASK
+                tag >>= _TAG_BITS
+                low = keys[idx]
+                if part == _SIMPLE:
+                    high, value, delta = low, simple._values[tag], False
+                elif part == _COMPRESSED:
+                    high, value, delta = compressed._high_keys[tag], compressed._values[tag], False
+                else:
+                    high, value, delta = sequential._high_keys[tag], sequential._values[tag], True
+                if not item <= high:
+                    rv.append(default)
+                    continue
+            rv.append(value + (item - low) if delta else value)
+        return rv
+
+    def items_ranges(self):
+        ''' Yield each (low_key, high_key, value, is_delta) range, in order.
+
+            The value is that of low_key; if is_delta, it increases by one
+            for each following key.
+        '''
+        simple = ((k, k, v, False) for k, v in self._simple._iter_tuples())
+        compressed = ((k1, k2, v, False) for k1, k2, v in self._compressed._iter_tuples())
+        sequential = ((k1, k2, v, True) for k1, k2, v in self._sequential._iter_tuples())
+        return MinIter(simple, compressed, sequential, key=_low_key)
+
+    def iter_ranges(self):
+        ''' Yield each (low_key, high_key) range, in order.
+
+            Adjacent ranges with different values are not merged.
+        '''
+        for k1, k2, v, is_delta in self.items_ranges():
+            yield k1, k2
 
     def __iter__(self):
-        return MinIter(self._simple, self._compressed, self._sequential)
+        return _expand_ranges(self.iter_ranges())
 
     def __len__(self):
         return self._simple._len + self._compressed._len + self._sequential._len
 
     def __repr__(self):
         return '%s(simple=%r, compressed=%r, delta=%r)' % (self.__class__.__qualname__, self._simple, self._compressed, self._sequential)
+
+
+# Serialization of the frozen state.
+#
+# The file is a small pickled header, followed by every array of uint32s
+# (typically keys) packed back-to-back. Anything else is pickled inline in
+# the header. Loading maps the file and returns zero-copy views into it, so
+# processes that load the same file share the page cache. That includes the
+# merged index of AutoSet and AutoMap, which is saved rather than rebuilt.
+_DUMP_MAGIC = b'uni.mem\n'
+_DUMP_VERSION = 2
+_UINT32_MAX = 0xFFFFFFFF
+
+
+def _is_packable(seq):
+    for x in seq:
+        if type(x) is not int or not 0 <= x <= _UINT32_MAX:
+            return False
+    return True
+
+
+def _encode_raw(raw, chunks, offset):
+    if isinstance(raw, tuple):
+        rv = []
+        for x in raw:
+            x, offset = _encode_raw(x, chunks, offset)
+            rv.append(x)
+        return ('tuple', rv), offset
+    if isinstance(raw, int):
+        return ('inline', raw), offset
+    if _is_packable(raw):
+        data = array('I', raw).tobytes()
+        chunks.append(data)
+        return ('packed', offset, len(raw)), offset + len(data)
+    return ('inline', list(raw)), offset
+
+
+def _decode_raw(skel, buf, swap):
+    kind = skel[0]
+    if kind == 'tuple':
+        return tuple([_decode_raw(x, buf, swap) for x in skel[1]])
+    if kind == 'inline':
+        return skel[1]
+    assert kind == 'packed'
+    _, offset, count = skel
+    view = buf[offset:offset + 4 * count]
+    if swap:
+        rv = array('I', view) # pragma: no cover
+        rv.byteswap() # pragma: no cover
+        return rv # pragma: no cover
+    return view.cast('I')
+
+
+def dump(obj, fo):
+    ''' Write a frozen container to the binary file `fo`.
+
+        The file can only be loaded by the same `uni.mem` variant.
+    '''
+    chunks = []
+    skel, _ = _encode_raw(obj._to_raw(), chunks, 0)
+    header = pickle.dumps((_DUMP_VERSION, _algo.__name__, obj.__class__.__qualname__, sys.byteorder, skel), pickle.HIGHEST_PROTOCOL)
+    # Pad so that the arrays are suitably aligned.
+    pad = -(len(_DUMP_MAGIC) + 4 + len(header)) % 8
+    fo.write(_DUMP_MAGIC)
+    fo.write(struct.pack('<I', len(header) + pad))
+    fo.write(header)
+    fo.write(bytes(pad))
+    for data in chunks:
+        fo.write(data)
+
+
+def load(fn):
+    ''' Map a file written by `dump` back into a frozen container.
+    '''
+    with open(fn, 'rb') as fo:
+        if fo.read(len(_DUMP_MAGIC)) != _DUMP_MAGIC:
+            raise ValueError('not a uni.mem file: %r' % fn)
+        header_len, = struct.unpack('<I', fo.read(4))
+        version, algo, cls_name, byteorder, skel = pickle.loads(fo.read(header_len))
+        if version != _DUMP_VERSION or algo != _algo.__name__:
+            raise ValueError('incompatible uni.mem file: %r' % fn)
+        cls = globals()[cls_name]
+        buf = memoryview(mmap.mmap(fo.fileno(), 0, access=mmap.ACCESS_READ))
+        buf = buf[len(_DUMP_MAGIC) + 4 + header_len:]
+    raw = _decode_raw(skel, buf, byteorder != sys.byteorder)
+    return cls._from_raw(*raw)
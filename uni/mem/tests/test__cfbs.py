@@ -13,6 +13,7 @@
 #
 #   You should have received a copy of the GNU Lesser General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from array import array
 import numpy as np
 from string import ascii_lowercase
 import unittest
@@ -143,3 +144,28 @@ class TestCfbs(unittest.TestCase):
             order_in_numpy_array = cfbs.make_order(iter(range(sz)), into=np.ndarray(sz, dtype=np.int32))
             assert isinstance(order_in_numpy_array, np.ndarray)
             assert all(order_in_python_list == order_in_numpy_array)
+
+    def test_freeze(self):
+        for sz in range(300):
+            orig = list(range(sz))
+            arr = list(orig)
+            assert cfbs.freeze(arr) is arr
+            assert arr == cfbs.make_order(orig)
+            assert [orig[cfbs.order_index(n, sz)] for n in range(sz)] == arr
+            packed = array('I', orig)
+            assert cfbs.freeze(packed) is packed
+            assert packed.tolist() == arr
+        assert cfbs.freeze(range(5)) == cfbs.make_order(range(5))
+        assert cfbs.freeze('dcba'[::-1]) == list('cbda')
+
+    def test_search(self):
+        for sz in range(100):
+            order = cfbs.make_order(range(0, 2 * sz, 2))
+            for item in range(-2, 2 * sz + 2):
+                rv = cfbs.search(order, item)
+                expected = cfbs._do_search(order, item)
+                assert rv == (-1 if expected is None else expected), (sz, item)
+                # Note: successor(-1, i) == first(i), except when i == 0
+                nxt = cfbs.successor(rv, sz) if sz else None
+                assert rv == -1 or order[rv] <= item
+                assert nxt is None or item < order[nxt]
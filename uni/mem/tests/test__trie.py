@@ -0,0 +1,93 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from array import array
+import bisect
+import os
+import random
+import tempfile
+import unittest
+
+from uni.mem import _trie as trie
+
+
+class TestTrie(unittest.TestCase):
+    def check(self, keys, probes):
+        arr = trie.freeze(keys)
+        assert list(arr) == list(keys)
+        for item in probes:
+            assert trie.search(arr, item) == bisect.bisect_right(keys, item) - 1, item
+        return arr
+
+    def test_table(self):
+        assert trie.make_table([]) is None
+        assert trie.make_table(['a', 'b']) is None
+        assert trie.make_table([1, 1]) is None
+        assert trie.make_table([2, 1]) is None
+        assert trie.make_table([-1, 1]) is None
+        assert trie.make_table([1, 0x110000]) is None
+        assert trie.make_table([True]) is None
+        limit, bases, offsets, leaves = trie.make_table([0x10, 0x20, 0x4E00])
+        assert limit == 0x4F00
+        assert len(bases) == len(offsets) == 0x4F
+        # all-empty, 0x00 and 0x4E00 blocks
+        assert len(leaves) == 3 * trie.BLOCK_SIZE
+        # Blocks with the same pattern share a leaf.
+        limit, bases, offsets, leaves = trie.make_table([0x110, 0x210, 0x310, 0x411, 0x10FF10])
+        assert len(leaves) == 3 * trie.BLOCK_SIZE
+
+    def test_search(self):
+        probes = list(range(-2, 0x1100)) + [0x10FFFF, 0x110000, 1.5, True]
+        self.check([], probes)
+        arr = self.check([0], probes)
+        assert arr.table is not None
+        self.check([0x10FFFF], probes)
+        self.check([1, 2, 3, 0x100, 0x1FF, 0x200], probes)
+        self.check([0x41, 0x61, 0x100, 0xE00, 0xFFF], probes)
+        arr = self.check(['a', 'c'], ['', 'a', 'b', 'c', 'd'])
+        assert arr.table is Ellipsis
+
+    def test_packed(self):
+        probes = list(range(-2, 0x1100)) + [0x10FFFF, 0x110000]
+        keys = [0x41, 0x61, 0x100, 0xE00, 0xFFF]
+        arr = self.check(array('I', keys), probes)
+        assert type(arr) is trie.FrozenArray and arr.typecode == 'I'
+        assert arr.table is not None
+        # Loaded arrays can't be copied, so their table is kept on the side.
+        view = memoryview(arr.tobytes()).cast('I')
+        assert self.check(view, probes) is view
+        assert trie._tables[id(view)] is not None
+        key = id(view)
+        del view
+        assert key not in trie._tables
+
+    def test_load(self):
+        from uni.mem import trie as mem
+        m = mem.RangeMap({cp: cp % 3 for cp in range(0x100, 0x3000, 5)})
+        with tempfile.TemporaryDirectory() as d:
+            fn = os.path.join(d, 'obj.bin')
+            with open(fn, 'wb') as fo:
+                mem.dump(m, fo)
+            loaded = mem.load(fn)
+        assert type(loaded._low_keys) is memoryview
+        assert [loaded.get(k) for k in range(0x3100)] == [m.get(k) for k in range(0x3100)]
+        # The two-stage table survives, rather than falling back to bisect.
+        assert trie._tables[id(loaded._low_keys)] is not None
+
+    def test_random(self):
+        for _ in range(20):
+            keys = sorted(random.sample(range(0x3000), random.randint(0, 300)))
+            probes = [random.randrange(-1, 0x3100) for _ in range(300)]
+            self.check(keys, probes + keys)
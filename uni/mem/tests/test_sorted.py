@@ -14,20 +14,80 @@
 #   You should have received a copy of the GNU Lesser General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import abc
+from array import array, typecodes
 import importlib
 import numpy as np
+import os
+import random
+import tempfile
 import unittest
+import warnings
 
 mod = importlib.import_module(__name__.replace('.mem.tests.test_', '.mem.'))
 for name in '''
     SortedSet RangeSet AutoSet
     SortedMap RangeMap DeltaMap AutoMap
+    dump load
 '''.split():
     globals()[name] = getattr(mod, name)
 del name
 from uni._util import ErrorBool
 
 
+def dump_load(obj):
+    with tempfile.TemporaryDirectory() as d:
+        fn = os.path.join(d, 'obj.bin')
+        with open(fn, 'wb') as fo:
+            dump(obj, fo)
+        rv = load(fn)
+        # The result must outlive the file.
+    return rv
+
+
+def random_ranges(rng, n):
+    ''' Return sorted, disjoint (low, high) pairs, often adjacent.
+    '''
+    rv = []
+    key = 0
+    for _ in range(n):
+        low = key + rng.choice([0, 0, 1, 2])
+        high = low + rng.choice([0, 0, 0, 1, 2])
+        rv.append((low, high))
+        key = high + 1
+    return rv
+
+
+def random_triples(rng, n, *, need_int_value):
+    rv = []
+    value = 0
+    for low, high in random_ranges(rng, n):
+        if not need_int_value and rng.random() < 0.1:
+            value = rng.choice([None, 'x'])
+        elif type(value) is not int:
+            value = rng.randrange(5)
+        else:
+            value += rng.choice([-1, 0, 0, 1, 1, 2])
+        rv.append((low, high, value))
+    return rv
+
+
+def expand_triples(triples, delta):
+    return [(k, v + (k - low) if delta else v) for low, high, v in triples for k in range(low, high + 1)]
+
+
+def shuffled_rows(rng, triples):
+    ''' Return rows like those of Schema.load, as shuffled runs of triples.
+    '''
+    rows = [[(low, high) if low != high or rng.random() < 0.5 else low, v] for low, high, v in triples]
+    runs = []
+    while rows:
+        n = rng.randrange(1, 10)
+        runs.append(rows[:n])
+        del rows[:n]
+    rng.shuffle(runs)
+    return (row for run in runs for row in run)
+
+
 class _TestSetBase(unittest.TestCase, metaclass=abc.ABCMeta):
     cls = None
     need_int_key = False
@@ -56,6 +116,9 @@ class _TestSetBase(unittest.TestCase, metaclass=abc.ABCMeta):
             s = self.cls(['foo', 'bar'])
             assert s and len(s) == 2
             assert list(s) == ['bar', 'foo']
+        s = self.cls([2, 1, 2])
+        assert s and len(s) == 2
+        assert list(s) == [1, 2]
 
     def test_lookup(self):
         s = self.cls()
@@ -95,6 +158,17 @@ class _TestSetBase(unittest.TestCase, metaclass=abc.ABCMeta):
             u = self.convert_raw('O', *r)
             v = self.cls._from_raw(*u)
 
+    def test_dump(self):
+        for s in [self.cls(), self.cls({2, 1}), self.cls(range(100, 200, 3))]:
+            t = dump_load(s)
+            assert type(t) is type(s)
+            assert s == t and list(s) == list(t)
+            assert [x in t for x in range(210)] == [x in s for x in range(210)]
+        if not self.need_int_key:
+            s = self.cls({'foo', 'bar'})
+            t = dump_load(s)
+            assert s == t and list(s) == list(t)
+
     def cls_from_pairs(self, pairs):
         rv = self.cls()
         append_range = self.append_range
@@ -108,6 +182,33 @@ class _TestSetBase(unittest.TestCase, metaclass=abc.ABCMeta):
     def append_range(self, low_key, high_key):
         pass # pragma: no cover
 
+    @staticmethod
+    @abc.abstractmethod
+    def bulk_from_pairs(cls, pairs):
+        pass # pragma: no cover
+
+    def test_bulk(self):
+        rng = random.Random(0)
+        for n in [0, 1, 2, 3] + [rng.randrange(50) for _ in range(200)]:
+            pairs = random_ranges(rng, n)
+            expected = self.cls_from_pairs(pairs)
+            actual = self.bulk_from_pairs(self.cls, pairs)
+            assert actual._to_raw() == expected._to_raw(), pairs
+            assert list(actual) == list(expected)
+            assert len(actual) == len(expected)
+
+    def test_rows(self):
+        if not hasattr(self.cls, 'from_rows'):
+            return
+        rng = random.Random(5)
+        for n in [0, 1, 2, 3] + [rng.randrange(50) for _ in range(50)]:
+            pairs = random_ranges(rng, n)
+            s = self.cls.from_rows(shuffled_rows(rng, [(low, high, None) for low, high in pairs]))
+            assert list(s) == [k for low, high in pairs for k in range(low, high + 1)]
+        assert list(self.cls.from_rows([[3], [(1, 2)]])) == [1, 2, 3]
+        self.assertRaises(ValueError, self.cls.from_rows, [[(0, 3)], [(3, 5)]])
+        self.assertRaises(ValueError, self.cls.from_rows, [[(5, 3)]])
+
     def test_harder(self):
         # important key patterns:
         # (x = prior, X = being added)
@@ -159,6 +260,39 @@ class _TestSetBase(unittest.TestCase, metaclass=abc.ABCMeta):
         ]
 
 
+class _TestAlgebraMixin:
+    def random_set(self, rng, n):
+        pairs = [(low, high) for low, high in random_ranges(rng, n) if rng.random() < 0.6]
+        return self.cls.from_sorted_ranges(pairs)
+
+    def test_algebra(self):
+        rng = random.Random(4)
+        for n in [0, 1, 2, 3] + [rng.randrange(60) for _ in range(100)]:
+            a = self.random_set(rng, n)
+            b = self.random_set(rng, rng.randrange(60))
+            for other in [b, RangeSet(b), AutoSet(b)]:
+                for actual, expected in [
+                        (a | other, set(a) | set(b)),
+                        (a & other, set(a) & set(b)),
+                        (a - other, set(a) - set(b)),
+                        (a ^ other, set(a) ^ set(b)),
+                ]:
+                    assert type(actual) is RangeSet and actual._frozen
+                    assert set(actual) == expected and len(actual) == len(expected)
+                    assert RangeSet.from_sorted_ranges(actual.iter_ranges())._to_raw() == actual._to_raw()
+            c = a.complement()
+            assert type(c) is RangeSet and c._frozen
+            assert len(c) == 0x110000 - len(a)
+            assert not (c & a)
+            assert list((c | a).iter_ranges()) == [(0, 0x10FFFF)]
+            assert c.complement()._to_raw() == RangeSet(a)._to_raw()
+        # Anything else still works, just not on ranges.
+        a = self.cls([1, 2, 3, 7])
+        assert a | {4} == {1, 2, 3, 4, 7}
+        assert a - [1, 7] == {2, 3}
+        assert {2, 9} & a == {2}
+
+
 class _TestMapBase(unittest.TestCase, metaclass=abc.ABCMeta):
     cls = None
     need_int_key = False
@@ -249,6 +383,68 @@ class _TestMapBase(unittest.TestCase, metaclass=abc.ABCMeta):
             v = self.cls._from_raw(*u)
             assert m == t == v
 
+    def test_dump(self):
+        samples = [
+            self.cls(),
+            self.cls({3: -1, 1: -2, 2: -1}),
+            self.cls({k: k + 7 for k in range(100, 200)}),
+            self.cls({k: k // 10 for k in range(100, 200)}),
+        ]
+        if not self.need_int_value:
+            samples.append(self.cls({3: 'x', 1: 'y', 2: 'x'}))
+            samples.append(self.cls({1: True, 2: False, 3: False}))
+        for m in samples:
+            t = dump_load(m)
+            assert type(t) is type(m)
+            assert m == t and list(m.items()) == list(t.items())
+            assert all([type(m[k]) is type(t[k]) for k in m])
+        if not self.need_int_key:
+            m = self.cls({'foo': 1, 'bar': 2, 'baz': 1})
+            t = dump_load(m)
+            assert m == t and list(m.items()) == list(t.items())
+
+    def test_lookup_many(self):
+        m = self.cls()
+        assert m.lookup_many([]) == []
+        assert m.lookup_many([1, 2]) == [None, None]
+        m = self.cls({k: k // 10 + 7 for k in range(100, 200) if k % 13})
+        keys = [150, 99, 100, 150, 300, 0, 130, 199, 200, 117, 151, 150]
+        expected = [m.get(k, -1) for k in keys]
+        assert m.lookup_many(keys, -1) == expected
+        assert m.lookup_many(iter(keys), -1) == expected
+        assert m.lookup_many(array('I', keys), -1) == expected
+        assert m.lookup_many(np.array(keys, dtype=np.uint32), -1) == expected
+        assert m.lookup_many(bytes([99, 100, 150]), -1) == [-1, 17, 22]
+        assert m.lookup_many(''.join(map(chr, keys)), -1) == expected
+        # 'w' is new in Python 3.13, which deprecates 'u'.
+        for typecode in [c for c in 'uw' if c in typecodes]:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', DeprecationWarning)
+                text = array(typecode, ''.join(map(chr, keys)))
+            assert m.lookup_many(text, -1) == expected
+        assert m.lookup_many(range(300)) == [m.get(k) for k in range(300)]
+        m = self.cls({k: k + 7 for k in range(100, 200)})
+        assert m.lookup_many(range(300)) == [m.get(k) for k in range(300)]
+        if not self.need_int_key:
+            m = self.cls({'foo': 1, 'bar': 2, 'baz': 1})
+            assert m.lookup_many(['baz', 'qux', 'foo', 'baz']) == [1, None, 1, 1]
+
+    def test_dump_bad(self):
+        with tempfile.TemporaryDirectory() as d:
+            fn = os.path.join(d, 'obj.bin')
+            with open(fn, 'wb') as fo:
+                fo.write(b'garbage\n')
+            self.assertRaises(ValueError, load, fn)
+            with open(fn, 'wb') as fo:
+                dump(self.cls(), fo)
+            with open(fn, 'r+b') as fo:
+                fo.seek(len(b'uni.mem\n') + 4)
+                header = bytearray(fo.read())
+                header[header.index(b'uni.mem._')+9] ^= 0x20
+                fo.seek(len(b'uni.mem\n') + 4)
+                fo.write(header)
+            self.assertRaises(ValueError, load, fn)
+
     def cls_from_quads(self, quads):
         rv = self.cls()
         append_quad = self.append_quad
@@ -262,6 +458,36 @@ class _TestMapBase(unittest.TestCase, metaclass=abc.ABCMeta):
     def append_quad(self, low_key, high_key, value, is_delta):
         pass # pragma: no cover
 
+    @staticmethod
+    @abc.abstractmethod
+    def bulk_from_triples(cls, triples, delta):
+        pass # pragma: no cover
+
+    def test_bulk(self):
+        rng = random.Random(0)
+        for delta in [False, True]:
+            for n in [0, 1, 2, 3] + [rng.randrange(50) for _ in range(200)]:
+                triples = random_triples(rng, n, need_int_value=self.need_int_value or delta)
+                quads = [(low, high, value, delta if low != high else ErrorBool) for low, high, value in triples]
+                expected = self.cls_from_quads(quads)
+                actual = self.bulk_from_triples(self.cls, triples, delta)
+                assert actual._to_raw() == expected._to_raw(), (delta, triples)
+                assert list(actual.items()) == list(expected.items()) == expand_triples(triples, delta)
+                assert len(actual) == len(expected)
+
+    def test_rows(self):
+        if not hasattr(self.cls, 'from_rows'):
+            return
+        rng = random.Random(5)
+        delta = self.cls is DeltaMap
+        for n in [0, 1, 2, 3] + [rng.randrange(50) for _ in range(50)]:
+            triples = random_triples(rng, n, need_int_value=self.need_int_value)
+            m = self.cls.from_rows(shuffled_rows(rng, triples))
+            assert list(m.items()) == expand_triples(triples, delta)
+            assert list(dump_load(m).items()) == list(m.items())
+        self.assertRaises(ValueError, self.cls.from_rows, [[(0, 3), 1], [(3, 5), 1]])
+        self.assertRaises(ValueError, self.cls.from_rows, [[(5, 3), 1]])
+
     def test_harder(self):
         # important key patterns:
         # (x = prior, X = being added)
@@ -633,8 +859,12 @@ class TestSortedSet(_TestSetBase):
         for key in range(low_key, high_key + 1):
             self._append(key)
 
+    @staticmethod
+    def bulk_from_pairs(cls, pairs):
+        return cls.from_arrays(k for low, high in pairs for k in range(low, high + 1))
+
 
-class TestRangeSet(_TestSetBase):
+class TestRangeSet(_TestAlgebraMixin, _TestSetBase):
     cls = RangeSet
     need_int_key = True
 
@@ -646,18 +876,73 @@ class TestRangeSet(_TestSetBase):
 
     append_range = staticmethod(cls._append_range)
 
+    @staticmethod
+    def bulk_from_pairs(cls, pairs):
+        return cls.from_sorted_ranges(pairs)
+
+    def test_ranges(self):
+        rng = random.Random(3)
+        for n in [0, 1, 2, 3] + [rng.randrange(50) for _ in range(50)]:
+            s = dump_load(self.cls.from_sorted_ranges(random_ranges(rng, n)))
+            ranges = list(s.iter_ranges())
+            assert ranges == list(zip(sorted(s._low_keys), sorted(s._high_keys)))
+            assert [k for low, high in ranges for k in range(low, high + 1)] == list(s)
 
-class TestAutoSet(_TestSetBase):
+
+class TestAutoSet(_TestAlgebraMixin, _TestSetBase):
     cls = AutoSet
 
     @staticmethod
-    def convert_raw(key_dtype, simple_raw, compressed_raw):
+    def convert_raw(key_dtype, simple_raw, compressed_raw, index):
         simple_raw = TestSortedSet.convert_raw(key_dtype, *simple_raw)
         compressed_raw = TestRangeSet.convert_raw(key_dtype, *compressed_raw)
-        return simple_raw, compressed_raw
+        keys, tags = index
+        index = np.array(keys, dtype=key_dtype), np.array(tags, dtype='>u4')
+        return simple_raw, compressed_raw, index
 
     append_range = staticmethod(cls._append_range)
 
+    @staticmethod
+    def bulk_from_pairs(cls, pairs):
+        return cls.from_arrays([low for low, high in pairs], [high for low, high in pairs])
+
+    def test_index(self):
+        rng = random.Random(1)
+        for n in [0, 1, 2, 3] + [rng.randrange(50) for _ in range(50)]:
+            pairs = [(low, high) for low, high in random_ranges(rng, n) if rng.random() < 0.7]
+            expected = {k for low, high in pairs for k in range(low, high + 1)}
+            s = self.cls.from_sorted_ranges(pairs)
+            assert s._index is None
+            loaded = dump_load(s)
+            assert s._index is not None
+            # Saved with the rest, so it is mapped rather than rebuilt.
+            assert all(type(x) is memoryview for x in loaded._index)
+            for t in [s, loaded]:
+                assert [k in t for k in range(-1, 3 * n + 2)] == [k in expected for k in range(-1, 3 * n + 2)]
+            assert dump_load(loaded) == s
+
+    def test_ranges(self):
+        rng = random.Random(2)
+        for n in [0, 1, 2, 3] + [rng.randrange(50) for _ in range(50)]:
+            pairs = random_ranges(rng, n)
+            s = self.cls.from_sorted_ranges(pairs)
+            ranges = list(s.iter_ranges())
+            assert ranges == sorted(ranges)
+            assert [k for low, high in ranges for k in range(low, high + 1)] == list(s)
+            assert self.cls.from_sorted_ranges(ranges)._to_raw() == s._to_raw()
+        s = self.cls({'foo', 'bar'})
+        assert list(s.iter_ranges()) == [('bar', 'bar'), ('foo', 'foo')]
+
+    def test_algebra_str(self):
+        a = self.cls({'foo', 'bar'})
+        b = self.cls({'bar', 'baz'})
+        assert type(a | b) is AutoSet
+        assert a | b == {'foo', 'bar', 'baz'}
+        assert a & b == {'bar'}
+        assert a - b == {'foo'}
+        assert a ^ b == {'foo', 'baz'}
+        self.assertRaises(TypeError, a.complement)
+
 
 class TestSortedMap(_TestMapBase):
     cls = SortedMap
@@ -678,6 +963,11 @@ class TestSortedMap(_TestMapBase):
         for i, key in enumerate(range(low_key, high_key + 1)):
             self._append(key, value + i)
 
+    @staticmethod
+    def bulk_from_triples(cls, triples, delta):
+        items = expand_triples(triples, delta)
+        return cls.from_arrays([k for k, v in items], [v for k, v in items])
+
 
 class TestRangeMap(_TestMapBase):
     cls = RangeMap
@@ -699,6 +989,22 @@ class TestRangeMap(_TestMapBase):
         for i, key in enumerate(range(low_key, high_key + 1)):
             self._append_range(key, key, value + i)
 
+    @staticmethod
+    def bulk_from_triples(cls, triples, delta):
+        if delta:
+            return cls.from_sorted_ranges((k, k, v) for k, v in expand_triples(triples, delta))
+        return cls.from_arrays([t[0] for t in triples], [t[1] for t in triples], [t[2] for t in triples])
+
+    def test_ranges(self):
+        rng = random.Random(3)
+        for n in [0, 1, 2, 3] + [rng.randrange(50) for _ in range(50)]:
+            triples = random_triples(rng, n, need_int_value=False)
+            m = self.cls.from_sorted_ranges(triples)
+            ranges = list(dump_load(m).items_ranges())
+            assert [r[:2] for r in ranges] == list(m.iter_ranges())
+            assert expand_triples(ranges, False) == list(m.items()) == expand_triples(triples, False)
+            assert self.cls.from_sorted_ranges(ranges)._to_raw() == m._to_raw()
+
 
 class TestDeltaMap(_TestMapBase):
     cls = DeltaMap
@@ -721,19 +1027,83 @@ class TestDeltaMap(_TestMapBase):
         for key in range(low_key, high_key + 1):
             self._append_range(key, key, value)
 
+    @staticmethod
+    def bulk_from_triples(cls, triples, delta):
+        if not delta:
+            items = expand_triples(triples, delta)
+            return cls.from_arrays([k for k, v in items], [k for k, v in items], [v for k, v in items])
+        return cls.from_sorted_ranges(triples)
+
+    def test_ranges(self):
+        rng = random.Random(3)
+        for n in [0, 1, 2, 3] + [rng.randrange(50) for _ in range(50)]:
+            triples = random_triples(rng, n, need_int_value=True)
+            m = self.cls.from_sorted_ranges(triples)
+            ranges = list(dump_load(m).items_ranges())
+            assert [r[:2] for r in ranges] == list(m.iter_ranges())
+            assert expand_triples(ranges, True) == list(m.items()) == expand_triples(triples, True)
+            assert self.cls.from_sorted_ranges(ranges)._to_raw() == m._to_raw()
+
 
 class TestAutoMap(_TestMapBase):
     cls = AutoMap
 
     @staticmethod
-    def convert_raw(key_dtype, value_dtype, simple_raw, compressed_raw, sequential_raw):
+    def convert_raw(key_dtype, value_dtype, simple_raw, compressed_raw, sequential_raw, index):
         simple_raw = TestSortedMap.convert_raw(key_dtype, value_dtype, *simple_raw)
         compressed_raw = TestRangeMap.convert_raw(key_dtype, value_dtype, *compressed_raw)
         sequential_raw = TestDeltaMap.convert_raw(key_dtype, value_dtype, *sequential_raw)
-        return simple_raw, compressed_raw, sequential_raw
+        keys, tags = index
+        index = np.array(keys, dtype=key_dtype), np.array(tags, dtype='>u4')
+        return simple_raw, compressed_raw, sequential_raw, index
 
     append_quad = staticmethod(cls._append_range)
 
+    @staticmethod
+    def bulk_from_triples(cls, triples, delta):
+        if delta:
+            return cls.from_sorted_ranges(triples, delta=True)
+        return cls.from_arrays([t[0] for t in triples], [t[1] for t in triples], [t[2] for t in triples])
+
+    def test_index(self):
+        rng = random.Random(1)
+        for delta in [False, True]:
+            for n in [0, 1, 2, 3] + [rng.randrange(50) for _ in range(50)]:
+                triples = [t for t in random_triples(rng, n, need_int_value=True) if rng.random() < 0.7]
+                expected = dict(expand_triples(triples, delta))
+                keys = range(-1, 3 * n + 2)
+                m = self.cls.from_sorted_ranges(triples, delta=delta)
+                assert m._index is None
+                assert [m.get(k) for k in keys] == [expected.get(k) for k in keys]
+                assert m._index is not None
+                m = dump_load(m)
+                assert all(type(x) is memoryview for x in m._index)
+                assert [m.get(k) for k in keys] == [expected.get(k) for k in keys]
+                assert m.lookup_many(keys) == [expected.get(k) for k in keys]
+
+    def test_ranges(self):
+        rng = random.Random(2)
+        for delta in [False, True]:
+            for n in [0, 1, 2, 3] + [rng.randrange(50) for _ in range(50)]:
+                triples = random_triples(rng, n, need_int_value=delta)
+                m = self.cls.from_sorted_ranges(triples, delta=delta)
+                quads = list(m.items_ranges())
+                assert [q[:2] for q in quads] == list(m.iter_ranges())
+                assert [(k, v + (k - low) if is_delta else v) for low, high, v, is_delta in quads for k in range(low, high + 1)] == list(m.items())
+                assert list(self.cls_from_quads(quads).items()) == list(m.items())
+        m = self.cls({'foo': 1, 'bar': 2})
+        assert list(m.items_ranges()) == [('bar', 'bar', 2, False), ('foo', 'foo', 1, False)]
+
+    def test_bitset(self):
+        from uni import prop_alias
+        B = prop_alias.Script_Extensions.bitset
+        a, b = B.from_mask(2), B.from_mask(3)
+        m = self.cls({1: a, 2: b, 3: B.from_mask(4)})
+        assert m[2] is b
+        assert list(m.items()) == [(1, a), (2, b), (3, B.from_mask(4))]
+        assert all(type(v) is B for v in m.values())
+
 
 del _TestSetBase
+del _TestAlgebraMixin
 del _TestMapBase
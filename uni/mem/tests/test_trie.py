@@ -0,0 +1 @@
+test_sorted.py
\ No newline at end of file
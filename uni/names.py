@@ -0,0 +1,448 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+''' Lookups between codepoints and their names.
+
+Names (from UnicodeData.txt), aliases (from NameAliases.txt) and named
+sequences (from NamedSequences.txt) share one namespace, so they are kept
+in one sorted, front-coded table: a search bisects the first name of each
+block, then decodes just that block. A second table is keyed by the
+UAX44-LM2 loose form of each name.
+
+The names of Hangul syllables and of CJK (and Tangut) ideographs are not
+stored at all, but generated from their codepoints, as the standard says.
+'''
+from array import array
+import bisect
+import heapq
+import os
+import re
+
+from .txt import schema as _schema
+
+
+_BLOCK_SIZE = 16
+_MAX_SHARED = 0xFF
+# Values in the tables: a codepoint, or _SEQUENCE_BASE plus the index of
+# a named sequence.
+_SEQUENCE_BASE = 0x110000
+
+_NAME_FILES = ('UnicodeData', 'NameAliases', 'NamedSequences', 'Jamo')
+_IDEOGRAPH_PREFIXES = {
+    '<CJK Ideograph': 'CJK UNIFIED IDEOGRAPH-',
+    '<Tangut Ideograph': 'TANGUT IDEOGRAPH-',
+}
+_HANGUL_LABEL = '<Hangul Syllable'
+_HANGUL_PREFIX = 'HANGUL SYLLABLE '
+_HANGUL_JAMO = (
+    # (first codepoint, count) of the leading, vowel and trailing jamo.
+    (0x1100, 19),
+    (0x1161, 21),
+    (0x11A7, 28),
+)
+
+_IGNORED = re.compile(r'[\s_]+')
+_MEDIAL_HYPHEN = re.compile(r'(?<=[^\W_])-(?=[^\W_])')
+
+
+def loose_key(name):
+    ''' Return the form of a name used for UAX44-LM2 loose matching.
+
+        Case, whitespace, underscores, and medial hyphens are ignored,
+        except for the hyphen of U+1180 HANGUL JUNGSEONG O-E.
+    '''
+    key = _IGNORED.sub('', name.upper())
+    if key == 'HANGULJUNGSEONGO-E':
+        return key
+    return _IGNORED.sub('', _MEDIAL_HYPHEN.sub('', name.upper()))
+
+
+def _shared_prefix(left, right):
+    rv = 0
+    for a, b in zip(left, right):
+        if a != b or rv == _MAX_SHARED:
+            break
+        rv += 1
+    return rv
+
+
+class FrontCodedTable:
+    ''' An immutable sorted table of strings, each with a value.
+
+        Every _BLOCK_SIZE'th key is kept whole; the rest are kept as the
+        length of the prefix they share with the previous key, and the
+        remaining suffix. All suffixes live in one str.
+    '''
+    def __init__(self, keys, values):
+        heads = []
+        shared = bytearray()
+        offsets = array('I', [0])
+        suffixes = []
+        prev = None
+        for i, key in enumerate(keys):
+            assert prev is None or prev < key, key
+            if i % _BLOCK_SIZE == 0:
+                heads.append(key)
+                n = 0
+            else:
+                n = _shared_prefix(prev, key)
+            shared.append(n)
+            suffixes.append(key[n:])
+            offsets.append(offsets[-1] + len(key) - n)
+            prev = key
+        assert len(shared) == len(values)
+        self._heads = heads
+        self._shared = bytes(shared)
+        self._offsets = offsets
+        self._text = ''.join(suffixes)
+        self._values = values
+
+    def _decode_block(self, block):
+        rv = []
+        key = ''
+        shared = self._shared
+        offsets = self._offsets
+        text = self._text
+        start = block * _BLOCK_SIZE
+        for i in range(start, min(start + _BLOCK_SIZE, len(shared))):
+            key = key[:shared[i]] + text[offsets[i]:offsets[i + 1]]
+            rv.append(key)
+        return rv
+
+    def key_at(self, idx):
+        return self._decode_block(idx // _BLOCK_SIZE)[idx % _BLOCK_SIZE]
+
+    def get(self, key, default=None):
+        block = bisect.bisect_right(self._heads, key) - 1
+        if block == -1:
+            return default
+        keys = self._decode_block(block)
+        idx = bisect.bisect_left(keys, key)
+        if idx < len(keys) and keys[idx] == key:
+            return self._values[block * _BLOCK_SIZE + idx]
+        return default
+
+    def lookup_many(self, keys, default=None):
+        ''' Look up many keys at once, returning a list in the same order.
+
+            Keys are looked up in sorted order, so each block is decoded
+            at most once.
+        '''
+        table = {}
+        block = -1
+        decoded = []
+        for key in sorted(set(keys)):
+            if block == -1 or block + 1 < len(self._heads) and self._heads[block + 1] <= key:
+                block = bisect.bisect_right(self._heads, key, max(block, 0)) - 1
+                if block == -1:
+                    table[key] = default
+                    continue
+                decoded = self._decode_block(block)
+            idx = bisect.bisect_left(decoded, key)
+            if idx < len(decoded) and decoded[idx] == key:
+                table[key] = self._values[block * _BLOCK_SIZE + idx]
+            else:
+                table[key] = default
+        return [table[k] for k in keys]
+
+    def items(self, prefix=''):
+        ''' Yield each (key, value) whose key starts with `prefix`, in order.
+        '''
+        block = max(bisect.bisect_right(self._heads, prefix) - 1, 0)
+        for block in range(block, len(self._heads)):
+            for i, key in enumerate(self._decode_block(block)):
+                if key.startswith(prefix):
+                    yield key, self._values[block * _BLOCK_SIZE + i]
+                elif key > prefix:
+                    return
+
+    def __len__(self):
+        return len(self._shared)
+
+
+class NameIndex:
+    ''' Exact, loose, and prefix lookups of the names of one Unicode version.
+    '''
+    def __init__(self, version, names, loose, codepoints, sequences, ranges, jamo):
+        self.version = version
+        self._names = names
+        self._loose = loose
+        # Sorted codepoints and, for each, the index of its name in _names.
+        self._codepoints = codepoints
+        self._sequences = sequences
+        # Sorted (low, high, prefix); a prefix of None means Hangul.
+        self._ranges = ranges
+        self._range_lows = [low for low, _, _ in ranges]
+        self._jamo = jamo
+
+    @classmethod
+    def from_files(cls, files, *, jobs=1, cache_dir=None):
+        ''' Load the name files among `files`, which must all be of the same
+            version. The members of .zip archives count too.
+        '''
+        infos = {}
+        # Collected as we go, since a later copy of a file replaces the
+        # earlier one.
+        versions = set()
+        for name, source in _schema.expand_archives(files):
+            sn, ext, ver = _schema.get_schema_info(name)
+            if sn in _NAME_FILES and ext.lower() == '.txt' and ver is not None:
+                infos[sn] = source, ver
+                versions.add(ver)
+        if len(versions) > 1:
+            raise ValueError('files from more than one version: %s' % ', '.join(sorted(map(str, versions))))
+        version = versions.pop() if versions else None
+        sns = sorted(infos)
+        all_rows = dict(zip(sns, _schema.load_files([infos[sn][0] for sn in sns], jobs=jobs, cache_dir=cache_dir)))
+        pairs = []
+        ranges = []
+        for row in all_rows.get('UnicodeData', ()):
+            (low, high), name = row[:2]
+            if not name.startswith('<'):
+                pairs.append((name, low))
+                continue
+            for label, prefix in _IDEOGRAPH_PREFIXES.items():
+                if name.startswith(label):
+                    ranges.append((low, high, prefix))
+            if name.startswith(_HANGUL_LABEL):
+                ranges.append((low, high, None))
+        ranges.sort()
+        num_names = len(pairs)
+        for (low, _), name, _ in all_rows.get('NameAliases', ()):
+            pairs.append((name, low))
+        sequences = []
+        for name, seq in all_rows.get('NamedSequences', ()):
+            pairs.append((name, _SEQUENCE_BASE + len(sequences)))
+            sequences.append(seq)
+        jamo = {}
+        for (low, _), jsn in all_rows.get('Jamo', ()):
+            jamo[low] = jsn.short_value_name
+        # The trailing jamo start with none at all.
+        jamo[_HANGUL_JAMO[2][0]] = ''
+        if any([prefix is None for _, _, prefix in ranges]):
+            for first, count in _HANGUL_JAMO:
+                if not all([cp in jamo for cp in range(first, first + count)]):
+                    raise ValueError('Hangul syllable names need Jamo.txt')
+        order = sorted(range(len(pairs)), key=lambda i: pairs[i][0])
+        names = FrontCodedTable([pairs[i][0] for i in order], array('I', [pairs[i][1] for i in order]))
+        positions = {i: pos for pos, i in enumerate(order) if i < num_names}
+        by_cp = sorted([(pairs[i][1], positions[i]) for i in range(num_names)])
+        codepoints = (array('I', [cp for cp, _ in by_cp]), array('I', [pos for _, pos in by_cp]))
+        loose_pairs = {}
+        for name, value in pairs:
+            key = loose_key(name)
+            if loose_pairs.setdefault(key, value) != value:
+                raise ValueError('names collide when loosely matched: %r' % key)
+        keys = sorted(loose_pairs)
+        loose = FrontCodedTable(keys, array('I', [loose_pairs[k] for k in keys]))
+        return cls(version, names, loose, codepoints, sequences, ranges, jamo)
+
+    @classmethod
+    def from_directory(cls, ucd, **kwargs):
+        ''' Load the name files in a directory (e.g. `9.0.0/ucd`), or in
+            a UCD.zip there.
+        '''
+        return cls.from_files([os.path.join(ucd, f) for f in sorted(os.listdir(ucd))], **kwargs)
+
+    def _decode(self, value):
+        if value < _SEQUENCE_BASE:
+            return chr(value)
+        return self._sequences[value - _SEQUENCE_BASE]
+
+    def name(self, cp, default=None):
+        ''' Return the name of a codepoint, not counting aliases.
+        '''
+        i = bisect.bisect_right(self._range_lows, cp) - 1
+        if i != -1 and cp <= self._ranges[i][1]:
+            low, _, prefix = self._ranges[i]
+            if prefix is not None:
+                return '%s%04X' % (prefix, cp)
+            s_index = cp - low
+            t_count = _HANGUL_JAMO[2][1]
+            vt_count = _HANGUL_JAMO[1][1] * t_count
+            parts = (s_index // vt_count, s_index % vt_count // t_count, s_index % t_count)
+            return _HANGUL_PREFIX + ''.join([self._jamo[first + p] for (first, _), p in zip(_HANGUL_JAMO, parts)])
+        cps, positions = self._codepoints
+        idx = bisect.bisect_left(cps, cp)
+        if idx < len(cps) and cps[idx] == cp:
+            return self._names.key_at(positions[idx])
+        return default
+
+    def _hangul_code(self, low, suffix):
+        # Some jamo names are prefixes of others, so try every split.
+        jamo = self._jamo
+        (l_first, l_count), (v_first, v_count), (t_first, t_count) = _HANGUL_JAMO
+        for l in range(l_count):
+            l_name = jamo[l_first + l]
+            if not suffix.startswith(l_name):
+                continue
+            for v in range(v_count):
+                lv_name = l_name + jamo[v_first + v]
+                if not suffix.startswith(lv_name):
+                    continue
+                for t in range(t_count):
+                    if lv_name + jamo[t_first + t] == suffix:
+                        return low + (l * v_count + v) * t_count + t
+        return None
+
+    def _algorithmic_code(self, name, loose):
+        key = loose_key(name) if loose else name
+        for low, high, prefix in self._ranges:
+            fixed = _HANGUL_PREFIX if prefix is None else prefix
+            if loose:
+                fixed = loose_key(fixed + '0')[:-1]
+            if not key.startswith(fixed):
+                continue
+            suffix = key[len(fixed):]
+            if prefix is None:
+                cp = self._hangul_code(low, suffix)
+            elif 4 <= len(suffix) <= 6 and all([c in '0123456789ABCDEFabcdef' for c in suffix]):
+                cp = int(suffix, 16)
+            else:
+                continue
+            if cp is not None and low <= cp <= high:
+                # Reject other spellings, like extra leading zeros.
+                generated = self.name(cp)
+                if (loose_key(generated) if loose else generated) == key:
+                    return cp
+        return None
+
+    def _find(self, name, loose):
+        if loose:
+            value = self._loose.get(loose_key(name))
+        else:
+            value = self._names.get(name)
+        if value is None:
+            value = self._algorithmic_code(name, loose)
+        return value
+
+    def lookup(self, name, *, loose=False):
+        ''' Return the character, or named sequence, with a name or alias.
+
+            Raise KeyError if there is none.
+        '''
+        value = self._find(name, loose)
+        if value is None:
+            raise KeyError(name)
+        return self._decode(value)
+
+    def code(self, name, default=None, *, loose=False):
+        ''' Return the codepoint with a name or alias.
+
+            Named sequences have no codepoint, so they give `default`.
+        '''
+        value = self._find(name, loose)
+        if value is None or value >= _SEQUENCE_BASE:
+            return default
+        return value
+
+    def lookup_many(self, names, default=None, *, loose=False):
+        ''' Like `lookup` for many names at once, returning a list in the
+            same order. Missing names give `default`.
+        '''
+        names = list(names)
+        if loose:
+            values = self._loose.lookup_many([loose_key(name) for name in names])
+        else:
+            values = self._names.lookup_many(names)
+        rv = []
+        for name, value in zip(names, values):
+            if value is None:
+                value = self._algorithmic_code(name, loose)
+            rv.append(default if value is None else self._decode(value))
+        return rv
+
+    def _algorithmic_items(self, prefix, loose):
+        rv = []
+        for low, high, fixed in self._ranges:
+            if fixed is None:
+                fixed = _HANGUL_PREFIX
+            if loose:
+                fixed = loose_key(fixed + '0')[:-1]
+            if fixed.startswith(prefix) or prefix.startswith(fixed):
+                for cp in range(low, high + 1):
+                    key = self.name(cp)
+                    if loose:
+                        key = loose_key(key)
+                    if key.startswith(prefix):
+                        rv.append((key, cp))
+        rv.sort()
+        return rv
+
+    def prefix(self, prefix, *, loose=False):
+        ''' Yield (name, character or named sequence) for every name and
+            alias that starts with `prefix`, in order of name.
+
+            If `loose`, names (and the prefix) are in their loose form.
+            Since a hyphen at the end of a prefix may turn out to be medial,
+            it is ignored.
+        '''
+        table = self._names
+        if loose:
+            table = self._loose
+            key = loose_key(prefix)
+            if key.endswith('-'):
+                key = loose_key(prefix + 'A')[:-1]
+            prefix = key
+        for key, value in heapq.merge(table.items(prefix), self._algorithmic_items(prefix, loose)):
+            yield key, self._decode(value)
+
+    def __len__(self):
+        ''' Return the number of stored (not generated) names and aliases.
+        '''
+        return len(self._names)
+
+
+def _parse_codepoint(s):
+    if s[:2].upper() == 'U+':
+        return int(s[2:], 16)
+    return None
+
+
+def main(args=None, exe=None):
+    import sys
+    if args is None:
+        args = sys.argv[1:]
+    if exe is None:
+        exe = sys.argv[0]
+    kwargs = {}
+    loose = False
+    while args:
+        if args[0] == '--loose':
+            loose = True
+        elif args[0].startswith('--cache='):
+            kwargs['cache_dir'] = args[0][len('--cache='):]
+        elif args[0].startswith('--jobs='):
+            kwargs['jobs'] = int(args[0][len('--jobs='):]) or None
+        else:
+            break
+        del args[0]
+    if len(args) < 2 or args[0].startswith('-'):
+        sys.exit('Usage: %s [--loose] [--cache=DIR] [--jobs=N (0 for all cores)] ucd-dir (name | U+XXXX) ...' % exe) # pragma: no cover
+    index = NameIndex.from_directory(args[0], **kwargs)
+    for arg in args[1:]:
+        cp = _parse_codepoint(arg)
+        if cp is not None:
+            print('%s: %s' % (arg, index.name(cp, '')))
+            continue
+        value = index.lookup_many([arg], loose=loose)[0]
+        if value is None:
+            print('%s:' % arg)
+        else:
+            print('%s: %s' % (arg, ' '.join(['U+%04X' % ord(c) for c in value])))
+
+
+if __name__ == '__main__':
+    main()
@@ -19,14 +19,56 @@
 # Also other internal stuff! This turns out to be really useful.
 # (there's no reason a "property" has to apply to a single codepoint)
 
+# Nothing is built at import time. The classes are all created on first
+# access to the module, and each class builds its values (or compiles its
+# regex) on first access to the class. Before Python 3.7, modules can't
+# have a __getattr__, so the classes are created at the end of the import.
+
+import sys
+
 from . import prop_base as prop, versioning
 from .versioning import parse as v
 
-__all__ = []
+_initialized = False
+_initializing = False
+
+
+def __getattr__(name):
+    if name == '__all__' or not name.startswith('__'):
+        # Waits for any other thread that is creating the classes.
+        materialize()
+        g = globals()
+        if name in g:
+            return g[name]
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+    materialize()
+    return sorted(globals())
+
+
+def materialize():
+    ''' Create all the property classes now, rather than on first use.
+    '''
+    global _initialized, _initializing
+    if _initialized:
+        return
+    with prop._init_lock:
+        # Classes that are being built may look each other up.
+        if _initialized or _initializing:
+            return
+        _initializing = True
+        try:
+            _init_classes()
+        finally:
+            _initializing = False
+        _initialized = True
 
 
 def _init_classes():
     g = globals()
+    g['__all__'] = []
 
     # implementation internals (names all of the form X_*)
     prop.make_enum(g, ['X_Property_Status'], [
@@ -1289,4 +1331,5 @@ def _init_classes():
     prop.make_re(g, ['kRSTUnicode'], r'[0-9]{1,3}.[0-9]{1,2}', None, status=Informative, scope=Dictionary_like_Data, min=v('9.0.0'))
 
 
-_init_classes()
+if sys.version_info < (3, 7):
+    materialize() # pragma: no cover
@@ -16,9 +16,11 @@
 ''' Fixed classes used to support uni.alias and its dynamic classes.
 '''
 
+import collections
 import decimal, fractions
 from functools import partial
 import re
+import threading
 import unicodedata # just for normalize('NFD', ...) during regexes
 
 from . import _util, versioning
@@ -34,7 +36,59 @@ def _split(s):
     return rv
 
 
-class _Property:
+# Held while building anything lazily, both here and in uni.prop_alias.
+# It is reentrant, since building one class may need another.
+_init_lock = threading.RLock()
+_initializing = set()
+
+
+class _ConvertCache(dict):
+    ''' Raw strings to values, for one property class.
+    '''
+    __slots__ = ('hits', 'misses')
+
+    def __init__(self):
+        super().__init__()
+        self.hits = 0
+        self.misses = 0
+
+
+class _PropertyType(type):
+    ''' Metaclass that lets property classes build their tables on demand.
+
+        If a class has a `_materialize` function in its own __dict__, it is
+        called the first time a missing attribute is looked up, and removed
+        once it succeeds.
+
+        Every class also gets its own conversion cache (see
+        _EnumLikeProperty); __init_subclass__ would need Python 3.6.
+    '''
+    def __init__(cls, name, bases, namespace, **kwargs):
+        super().__init__(name, bases, namespace, **kwargs)
+        cls._convert_cache = _ConvertCache()
+
+    def __getattr__(cls, name):
+        if not name.startswith('__'):
+            with _init_lock:
+                init = cls.__dict__.get('_materialize')
+                if init is None:
+                    # Another thread may have just built it.
+                    try:
+                        return type.__getattribute__(cls, name)
+                    except AttributeError:
+                        pass
+                elif cls not in _initializing:
+                    _initializing.add(cls)
+                    try:
+                        init(cls)
+                    finally:
+                        _initializing.discard(cls)
+                    del cls._materialize
+                    return getattr(cls, name)
+        raise AttributeError('type object %r has no attribute %r' % (cls.__name__, name))
+
+
+class _Property(metaclass=_PropertyType):
     ''' Base of all exposed property classes.
 
         By default, this class is not instantiable.
@@ -76,15 +130,140 @@ class List(_Property):
         return cls.check([cls.element.convert(v) for v in _split(val)])
 
 
-# TODO actually optimize using bitsets when possible.
+class BitSet(int):
+    ''' Immutable set of values of an enum-like property, as a bit mask.
+
+        Bit `i` stands for `element.value_list[i]`. Since bits are plain
+        ints, union, intersection and membership are single int operations,
+        and a map can store the mask itself.
+
+        Bit positions are only stable within one version of this library,
+        so pickling goes through the value names.
+
+        New subclasses are created dynamically by make_set.
+    '''
+    __slots__ = ()
+
+    def __new__(cls, values=()):
+        mask = 0
+        for v in values:
+            assert isinstance(v, cls.element), v
+            mask |= 1 << v.bit
+        return int.__new__(cls, mask)
+
+    @classmethod
+    def from_mask(cls, mask):
+        assert 0 <= mask < 1 << len(cls.element.value_list)
+        return int.__new__(cls, mask)
+
+    def __reduce__(self):
+        return self._from_names, ([v.long_value_name for v in self],)
+
+    @classmethod
+    def _from_names(cls, names):
+        return cls([getattr(cls.element, n) for n in names])
+
+    def __repr__(self):
+        if not self:
+            return '%s()' % self.__class__.__qualname__
+        return '{%s}' % ', '.join([repr(v) for v in self])
+
+    def __iter__(self):
+        values = self.element.value_list
+        mask = int(self)
+        while mask:
+            low = mask & -mask
+            yield values[low.bit_length() - 1]
+            mask ^= low
+
+    def __len__(self):
+        return bin(self).count('1')
+
+    def __contains__(self, v):
+        return isinstance(v, self.element) and (self >> v.bit) & 1 == 1
+
+    def __or__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return int.__new__(type(self), int.__or__(self, other))
+
+    def __and__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return int.__new__(type(self), int.__and__(self, other))
+
+    def __xor__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return int.__new__(type(self), int.__xor__(self, other))
+
+    def __sub__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return int.__new__(type(self), int.__and__(self, ~other))
+
+    # Returning NotImplemented is not enough here, since int would still
+    # add the masks, and uni.mem would then think e.g. 2 and 3 adjacent.
+    def __add__(self, other):
+        raise TypeError('cannot add to %s' % type(self).__qualname__)
+
+    __radd__ = __add__
+    __ror__ = __or__
+    __rand__ = __and__
+    __rxor__ = __xor__
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return int.__eq__(self, other)
+
+    def __ne__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return int.__ne__(self, other)
+
+    __hash__ = int.__hash__
+
+    # Ordering is by inclusion, like frozenset.
+    def __le__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return int.__and__(self, ~other) == 0
+
+    def __lt__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self <= other and int.__ne__(self, other)
+
+    def __ge__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return other <= self
+
+    def __gt__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return other < self
+
+    def isdisjoint(self, other):
+        return not self & other
+
+
 class Set(_Property):
     ''' Properties whose values are a set of 0 or more of another property.
 
+        If the elements are enum-like values, the set is a `BitSet`.
+
         New subclasses are created dynamically by make_set.
     '''
+    bitset = None
+
     @classmethod
     def check(cls, val):
         assert issubclass(cls.element, _Property)
+        if cls.bitset is not None:
+            assert type(val) is cls.bitset, val
+            return val
         assert isinstance(val, set)
         for v in val:
             cls.element.check(v)
@@ -95,7 +274,10 @@ class Set(_Property):
         assert issubclass(cls.element, _Property)
         assert isinstance(val, str)
         rvl = [cls.element.convert(v) for v in _split(val)]
-        rv = set(rvl)
+        if cls.bitset is not None:
+            rv = cls.bitset(rvl)
+        else:
+            rv = set(rvl)
         assert len(rv) == len(rvl)
         return cls.check(rv)
 
@@ -128,8 +310,14 @@ class TaggedItem(_Property):
         return cls.check((None, cls.payload.convert(val)))
 
 
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'currsize'])
+
+
 class _EnumLikeProperty(_Property):
     ''' Base for properties with a fixed number of values.
+
+        Since files only use a few distinct spellings of each value,
+        conversions are cached per class, keyed by the raw string.
     '''
     @classmethod
     def check(cls, val):
@@ -139,20 +327,46 @@ class _EnumLikeProperty(_Property):
 
     @classmethod
     def convert(cls, val):
+        cache = cls._convert_cache
+        try:
+            rv = cache[val]
+        except KeyError:
+            rv = cache[val] = cls._convert_uncached(val)
+            cache.misses += 1
+        else:
+            cache.hits += 1
+        return rv
+
+    @classmethod
+    def _convert_uncached(cls, val):
         assert isinstance(val, str)
         by_name = cls.value_by_name
         val = _casefold(val)
         assert val in by_name, (cls.__name__, val)
         return cls.check(by_name[val.casefold()])
 
+    @classmethod
+    def convert_cache_info(cls):
+        ''' Report the statistics of the conversion cache, like functools.
+        '''
+        cache = cls._convert_cache
+        return CacheInfo(cache.hits, cache.misses, len(cache))
+
+    @classmethod
+    def convert_cache_clear(cls):
+        cls._convert_cache = _ConvertCache()
+
 
 class PropertyPerSe(_EnumLikeProperty):
     ''' Property whose values are the set of all properties.
     '''
-    # these are filled in by _make_class
-    value_by_name = {}
-    value_set = set()
-    value_list = []
+    def _materialize(cls):
+        # these are filled in by _make_class
+        cls.value_by_name = {}
+        cls.value_set = set()
+        cls.value_list = []
+        from . import prop_alias
+        prop_alias.materialize()
 
 
 class _InstantiableProperty(_EnumLikeProperty):
@@ -162,6 +376,7 @@ class _InstantiableProperty(_EnumLikeProperty):
     '''
     def __init__(self, index, aliases, *, manual_index):
         super().__init__()
+        self.bit = index
         self.value_aliases = aliases
         self.short_value_name = aliases[manual_index + 0]
         self.long_value_name = aliases[manual_index + (len(aliases) > manual_index + 1)]
@@ -169,6 +384,10 @@ class _InstantiableProperty(_EnumLikeProperty):
     def __repr__(self):
         return '%s.%s' % (self.__class__.__name__, self.long_value_name)
 
+    def __reduce__(self):
+        # Values are singletons, so unpickle by name rather than by contents.
+        return getattr, (self.__class__, self.long_value_name)
+
 
 class Enum(_InstantiableProperty):
     ''' Property whose values rarely expand in future versions.
@@ -185,7 +404,8 @@ class Enum(_InstantiableProperty):
 class Catalog(_InstantiableProperty):
     ''' Property whose values commonly expand in future versions.
 
-        As a result, they *cannot* meaningfully be used with bitsets.
+        As a result, they *cannot* meaningfully be used with persistent
+        bitsets; a BitSet of them is only valid within a single process.
     '''
 
 
@@ -454,6 +674,13 @@ def make_set(g, aliases, elem, **kwargs):
     class S(Set):
         element = elem
     _make_class(g, aliases, S, **kwargs)
+    if issubclass(elem, _InstantiableProperty):
+        class B(BitSet):
+            element = elem
+        B.__module__ = S.__module__
+        B.__name__ = 'bitset'
+        B.__qualname__ = '%s.bitset' % S.__qualname__
+        S.bitset = B
 
 
 def make_tagged_item(g, aliases, tag_, payload_, **kwargs):
@@ -465,21 +692,22 @@ def make_tagged_item(g, aliases, tag_, payload_, **kwargs):
 
 def make_enum(g, aliases, values, *, catalog=False, manual_index=False, **kwargs):
     class E(Catalog if catalog else Enum):
-        value_by_name = {}
-        value_set = set()
-        value_list = []
+        def _materialize(cls):
+            cls.value_by_name = {}
+            cls.value_list = []
+            for i, pvas in enumerate(values):
+                v = cls(i, pvas, manual_index=manual_index)
+                cls.value_list.append(v)
+                _make_aliases(cls.value_by_name, pvas, v, casefold=True)
+                _make_aliases(_util.ClassDict(cls), pvas, v, casefold=False)
+            cls.value_set = set(cls.value_by_name.values())
     _make_class(g, aliases, E, **kwargs)
-    for i, pvas in enumerate(values):
-        v = E(i, pvas, manual_index=manual_index)
-        E.value_list.append(v)
-        _make_aliases(E.value_by_name, pvas, v, casefold=True)
-        _make_aliases(_util.ClassDict(E), pvas, v, casefold=False)
-    E.value_set = set(E.value_by_name.values())
 
 
 def make_re(g, aliases, regexp, sep, **kwargs):
     class R(Regex):
-        regex = re.compile(regexp)
+        def _materialize(cls):
+            cls.regex = re.compile(regexp)
     elem_aliases = aliases if sep is None else ['X_Element_of_' + aliases[len(aliases) > 1]]
     _make_class(g, elem_aliases, R, **kwargs)
     if sep is not None:
@@ -13,9 +13,11 @@
 #
 #   You should have received a copy of the GNU Lesser General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import heapq
 import random
 import string
 import unittest
+import unittest.mock
 
 from uni._util import (
     ClassDict,
@@ -59,6 +61,22 @@ class TestMinIter(unittest.TestCase):
         assert list(MinIter([0, 2, 4, 6, 8], [1, 3, 5, 7, 9])) == lr10
         assert list(MinIter([1, 3, 5, 7, 9], [0, 2, 4, 6, 8])) == lr10
         assert list(MinIter([0], [0])) == [0, 0]
+        assert list(MinIter()) == []
+
+    def test_key(self):
+        ranges = list(MinIter([(0, 3, 'a'), (9, 9, 'b')], [(4, 4, 'c')], [], [(5, 8, None)], key=lambda r: r[0]))
+        assert ranges == [(0, 3, 'a'), (4, 4, 'c'), (5, 8, None), (9, 9, 'b')]
+
+    def test_key_ties(self):
+        # Before Python 3.5, heapq.merge has no key argument at all.
+        merge = heapq.merge
+        def old_merge(*iterables):
+            return merge(*iterables)
+        with unittest.mock.patch.object(heapq, 'merge', old_merge):
+            # Equal keys keep their order, and their items are never compared.
+            items = list(MinIter([(0, {}), (2, 'x')], [(0, None), (1, {})], [(0, 1)], key=lambda r: r[0]))
+            assert items == [(0, {}), (0, None), (0, 1), (1, {}), (2, 'x')]
+            assert list(MinIter([3, 1], [2], key=lambda x: -x)) == [3, 2, 1]
 
     def test_random(self):
         for _ in range(100):
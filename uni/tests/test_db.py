@@ -0,0 +1,226 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from uni import db, prop_alias as alias
+from uni.versioning import parse as v
+
+
+ucd = os.path.join(os.path.dirname(__file__), '../../www.unicode.org/Public/9.0.0/ucd')
+
+
+class TestDatabase(unittest.TestCase):
+    files = [
+        os.path.join(ucd, 'UnicodeData.txt'),
+        os.path.join(ucd, 'extracted/DerivedGeneralCategory.txt'),
+        os.path.join(ucd, 'Scripts.txt'),
+        os.path.join(ucd, 'LineBreak.txt'),
+        os.path.join(ucd, 'NameAliases.txt'),
+        os.path.join(ucd, 'CompositionExclusions.txt'),
+        os.path.join(ucd, 'PropList.txt'),
+        os.path.join(ucd, 'Unihan_NumericValues.txt'),
+        os.path.join(ucd, 'Index.txt'),
+        os.path.join(ucd, 'ReadMe.txt'),
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = db.Database.from_files(cls.files)
+
+    def test_files(self):
+        assert db.is_property_file(os.path.join(ucd, 'Scripts.txt'))
+        assert db.is_property_file(os.path.join(ucd, 'Unihan_NumericValues.txt'))
+        assert not db.is_property_file(os.path.join(ucd, 'Index.txt'))
+        assert not db.is_property_file(os.path.join(ucd, 'ReadMe.txt'))
+        assert not db.is_property_file(os.path.join(ucd, 'NormalizationTest.txt'))
+        assert not db.is_property_file(os.path.join(ucd, '../ReadMe.txt'))
+        assert not db.is_property_file(os.path.join(ucd, '../../ReadMe.txt'))
+
+    def test_resolve(self):
+        assert db.resolve('gc') is alias.General_Category
+        assert db.resolve('General_Category') is alias.General_Category
+        assert db.resolve('GENERAL_CATEGORY') is alias.General_Category
+        assert db.resolve(alias.Script) is alias.Script
+        assert db.resolve('X_Approx_Numeric_Value') is alias.X_Approx_Numeric_Value
+        self.assertRaises(KeyError, db.resolve, 'Not_A_Property')
+        self.assertRaises(KeyError, db.resolve, 'v')
+
+    def test_lookup(self):
+        d = self.db
+        assert d.version == v('9.0.0')
+        assert d.lookup(0x41, 'gc', 'sc', alias.Line_Break) == (alias.General_Category.Lu, alias.Script.Latin, alias.Line_Break.AL)
+        assert d.lookup(0x41) == ()
+        # Unassigned codepoints are only in the Derived file.
+        assert d.lookup(0x378, 'gc', 'na', default=0) == (alias.General_Category.Cn, 0)
+        assert d.lookup(0x20, 'WSpace', 'Bidi_M') == (True, False)
+        assert d.lookup(0x41, 'WSpace') == (None,)
+        assert d.lookup(0x958, 'CE') == (True,)
+        assert d.lookup(0x4E00, 'kPrimaryNumeric') == (1,)
+        self.assertRaises(KeyError, d.lookup, 0x41, 'Age')
+
+    def test_multi(self):
+        d = self.db
+        assert d.lookup(0x0000, 'Name_Alias') == (('NULL', 'NUL'),)
+        assert d.lookup(0x01A2, 'Name_Alias') == (('LATIN CAPITAL LETTER GHA',),)
+
+    def test_column(self):
+        d = self.db
+        gc = d.column('gc')
+        assert gc is d.column(alias.General_Category)
+        cps = range(0, 0x110000, 97)
+        assert gc.lookup_many(cps) == [d.lookup(cp, 'gc')[0] for cp in cps]
+        assert len(gc) == 0x110000
+        assert len(list(gc.items_ranges())) < 5000
+
+    def test_record(self):
+        d = self.db
+        rec = d.record(0x41)
+        assert rec[alias.General_Category] is alias.General_Category.Lu
+        assert rec[alias.Name] == 'LATIN CAPITAL LETTER A'
+        assert alias.White_Space not in rec
+        assert list(rec) == [p for p in d.properties() if p in rec]
+        assert alias.General_Category in d.properties()
+
+    def test_errors(self):
+        assert db.Database.from_files([]).properties() == []
+        with tempfile.TemporaryDirectory() as tmp:
+            old = os.path.join(tmp, '8.0.0/ucd')
+            os.makedirs(old)
+            shutil.copy(os.path.join(ucd, 'Jamo.txt'), old)
+            self.assertRaises(ValueError, db.Database.from_files, [os.path.join(ucd, 'Jamo.txt'), os.path.join(old, 'Jamo.txt')])
+        self.assertRaises(ValueError, db._combine_duplicates, 'x', [(1, 3, 'a'), (2, 2, 'b')])
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sub = os.path.join(tmp, '9.0.0/ucd')
+            os.makedirs(sub)
+            for f in ['Jamo.txt', 'Blocks.txt', 'ReadMe.txt']:
+                shutil.copy(os.path.join(ucd, f), sub)
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                db.main([sub, 'U+1100', 'JSN', 'blk'], 'uni.db')
+                db.main(['--backend=cfbs', '--jobs=1', '--cache=' + os.path.join(tmp, 'cache'), sub, '1100'], 'uni.db')
+            assert out.getvalue() == ''.join([
+                'JSN: Jamo_Short_Name.G\n',
+                'blk: Block.Hangul_Jamo\n',
+                'Block: Block.Hangul_Jamo\n',
+                'Jamo_Short_Name: Jamo_Short_Name.G\n',
+            ])
+
+
+class TestVersionedDatabase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        new = os.path.join(cls.tmp.name, '9.0.0/ucd')
+        old = os.path.join(cls.tmp.name, '8.0.0/ucd')
+        os.makedirs(new)
+        os.makedirs(old)
+        for f in ['UnicodeData.txt', 'Scripts.txt', 'LineBreak.txt', 'ReadMe.txt']:
+            shutil.copy(os.path.join(ucd, f), new)
+        # Files before 9.0.0 are ASCII. Pretend that Adlam is new, and
+        # that 'a' and 'c' changed.
+        def copy_old(f, fix=lambda line: line):
+            with open(os.path.join(ucd, f), encoding='utf-8') as fi, open(os.path.join(old, f), 'w', encoding='ascii', errors='replace') as fo:
+                for line in fi:
+                    fo.write(fix(line))
+        def fix_unicode_data(line):
+            if line.startswith('0061;'):
+                return line.replace(';0041;;0041', ';0042;;0042')
+            if line.startswith('0063;'):
+                return line.replace(';Ll;', ';Lo;')
+            return line
+        copy_old('Jamo.txt')
+        copy_old('ReadMe.txt')
+        copy_old('Scripts.txt', lambda line: '' if '; Adlam ' in line else line)
+        copy_old('UnicodeData.txt', fix_unicode_data)
+        cls.dirs = [old, new]
+        cls.dbs = [db.Database.from_directory(d) for d in cls.dirs]
+        cls.vdb = db.VersionedDatabase.from_directories(cls.dirs)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_versions(self):
+        vdb = self.vdb
+        assert vdb.versions() == [v('8.0.0'), v('9.0.0')]
+        assert vdb.base.version == v('9.0.0')
+        assert alias.Jamo_Short_Name in vdb.properties()
+        assert alias.Line_Break in vdb.properties()
+
+    def test_lookup(self):
+        vdb = self.vdb
+        assert vdb.lookup(0x1E900, 'sc', '9.0.0') is alias.Script.Adlam
+        assert vdb.lookup(0x1E900, 'sc', '8.0.0') is None
+        assert vdb.lookup(0x61, 'suc', v('8.0.0')) == 0x42
+        assert vdb.lookup(0x62, 'suc', v('8.0.0')) == 0x42
+        assert vdb.lookup(0x61, 'suc', v('9.0.0')) == 0x41
+        assert vdb.lookup(0x63, 'gc', '8.0.0') is alias.General_Category.Lo
+        assert vdb.lookup(0x63, 'gc', '9.0.0') is alias.General_Category.Ll
+        assert vdb.lookup(0x1100, 'JSN', '8.0.0') is alias.Jamo_Short_Name.G
+        assert vdb.lookup(0x1100, 'JSN', '9.0.0', default=0) == 0
+        assert vdb.lookup(0x41, 'lb', '8.0.0', default=0) == 0
+        self.assertRaises(KeyError, vdb.lookup, 0x41, 'blk', '9.0.0')
+        self.assertRaises(KeyError, vdb.lookup, 0x41, 'gc', '7.0.0')
+
+    def test_delta(self):
+        vdb = self.vdb
+        assert vdb.delta('gc', '9.0.0') is None
+        assert vdb.delta('na', '8.0.0') is None
+        assert list(vdb.delta('sc', '8.0.0').iter_ranges()) == [(0x1E900, 0x1E94A), (0x1E950, 0x1E959), (0x1E95E, 0x1E95F)]
+        assert list(vdb.delta('gc', v('8.0.0')).iter_ranges()) == [(0x63, 0x63)]
+        assert len(vdb.delta('JSN', '8.0.0')) == len(self.dbs[0].column('JSN'))
+
+    def test_exhaustive(self):
+        for d in self.dbs:
+            for prop in self.vdb.properties():
+                keys = set(range(0, 0x110000, 251))
+                column = d._columns.get(prop)
+                if column is not None:
+                    for k1, k2 in column.iter_ranges():
+                        keys.update([k1 - 1, k1, k2, k2 + 1])
+                keys = sorted(keys)
+                expected = column.lookup_many(keys) if column is not None else [None] * len(keys)
+                actual = [self.vdb.lookup(k, prop, d.version) for k in keys]
+                assert actual == expected, prop
+
+    def test_errors(self):
+        old, new = self.dbs
+        self.assertRaises(ValueError, db.VersionedDatabase.from_databases, [])
+        self.assertRaises(ValueError, db.VersionedDatabase.from_databases, [db.Database.from_files([])])
+        self.assertRaises(ValueError, db.VersionedDatabase.from_databases, [old, new])
+        self.assertRaises(ValueError, db.VersionedDatabase.from_databases, [new, old, old])
+
+    def test_diff(self):
+        from uni.mem.sorted import AutoMap
+        old = {k: k + 9 for k in range(1, 10)}
+        old[12] = 'x'
+        new = {0: 10, 1: 11, 2: 12, 3: 13, 4: 14, 5: 14, 6: 14, 7: 20, 8: 21, 12: 'x', 13: 'x'}
+        triples = list(db._diff_ranges(AutoMap(old), AutoMap(new)))
+        patched = dict(old)
+        for k1, k2, value in triples:
+            for k in range(k1, k2 + 1):
+                patched[k] = value
+        assert {k: v for k, v in patched.items() if v is not db._MISSING} == new
+        assert not any([k1 <= 12 <= k2 for k1, k2, _ in triples])
+        assert list(db._diff_ranges(None, None)) == []
+        assert list(db._diff_ranges(AutoMap(old), AutoMap(old))) == []
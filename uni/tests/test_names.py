@@ -0,0 +1,192 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unicodedata
+import unittest
+
+from uni import names
+from uni.versioning import parse as v
+
+
+ucd = os.path.join(os.path.dirname(__file__), '../../www.unicode.org/Public/9.0.0/ucd')
+
+
+class TestLooseKey(unittest.TestCase):
+    def test_loose_key(self):
+        assert names.loose_key('LATIN SMALL LETTER A') == 'LATINSMALLLETTERA'
+        assert names.loose_key('latin_small letter\ta') == 'LATINSMALLLETTERA'
+        assert names.loose_key('CJK UNIFIED IDEOGRAPH-4E00') == 'CJKUNIFIEDIDEOGRAPH4E00'
+        # Only medial hyphens are ignored.
+        assert names.loose_key('TIBETAN LETTER -A') == 'TIBETANLETTER-A'
+        assert names.loose_key('A-') == 'A-'
+        assert names.loose_key('HANGUL JUNGSEONG OE') == 'HANGULJUNGSEONGOE'
+        assert names.loose_key('hangul jungseong o-e') == 'HANGULJUNGSEONGO-E'
+
+
+class TestFrontCodedTable(unittest.TestCase):
+    def test_table(self):
+        keys = sorted(['', 'A', 'AB', 'ABC', 'B', 'X' * 300, 'X' * 301 + 'Y'] + ['K%03d' % i for i in range(40)])
+        table = names.FrontCodedTable(keys, list(range(len(keys))))
+        assert len(table) == len(keys)
+        # Every key is stored with at most 255 shared characters.
+        assert len(table._text) < sum([len(k) for k in keys])
+        for i, k in enumerate(keys):
+            assert table.key_at(i) == k
+            assert table.get(k) == i
+        assert table.get('AA') is None
+        assert table.get('Z', -1) == -1
+        probes = keys + ['AA', 'K0', 'K999', 'Z', 'X']
+        assert table.lookup_many(probes, -1) == [table.get(k, -1) for k in probes]
+        assert list(table.items('A')) == [('A', 1), ('AB', 2), ('ABC', 3)]
+        assert [k for k, _ in table.items('K01')] == ['K01%d' % i for i in range(10)]
+        assert list(table.items('KZ')) == []
+        assert len(list(table.items())) == len(keys)
+
+    def test_empty(self):
+        table = names.FrontCodedTable([], [])
+        assert len(table) == 0
+        assert table.get('A') is None
+        assert table.lookup_many(['A', 'B'], 0) == [0, 0]
+        assert list(table.items()) == []
+        table = names.FrontCodedTable(['B'], [1])
+        assert table.lookup_many(['A', 'B', 'C']) == [None, 1, None]
+
+
+class TestNameIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.index = names.NameIndex.from_directory(ucd)
+
+    def test_lookup(self):
+        index = self.index
+        assert index.version == v('9.0.0')
+        assert index.lookup('LATIN CAPITAL LETTER A') == 'A'
+        assert index.lookup('NUL') == '\0'
+        assert index.lookup('LATIN CAPITAL LETTER GHA') == 'Ƣ'
+        assert index.lookup('LATIN CAPITAL LETTER OI') == 'Ƣ'
+        assert index.lookup('LATIN CAPITAL LETTER A WITH MACRON AND GRAVE') == 'Ā̀'
+        assert index.lookup('HANGUL SYLLABLE GA') == '가'
+        assert index.lookup('HANGUL SYLLABLE HIH') == '힣'
+        assert index.lookup('CJK UNIFIED IDEOGRAPH-4E00') == '一'
+        assert index.lookup('CJK UNIFIED IDEOGRAPH-2A6D6') == '\U0002A6D6'
+        assert index.lookup('TANGUT IDEOGRAPH-17000') == '\U00017000'
+        for name in ['latin capital letter a', 'BOGUS', 'HANGUL SYLLABLE GX', 'HANGUL SYLLABLE',
+                'CJK UNIFIED IDEOGRAPH-4e00', 'CJK UNIFIED IDEOGRAPH-04E00', 'CJK UNIFIED IDEOGRAPH-9FFF',
+                'CJK UNIFIED IDEOGRAPH-', 'CJK UNIFIED IDEOGRAPH-XYZW']:
+            self.assertRaises(KeyError, index.lookup, name)
+        assert index.code('LATIN CAPITAL LETTER A') == 0x41
+        assert index.code('LATIN CAPITAL LETTER A WITH MACRON AND GRAVE') is None
+        assert index.code('BOGUS', -1) == -1
+
+    def test_loose(self):
+        index = self.index
+        assert index.lookup('latin capital letter a', loose=True) == 'A'
+        assert index.lookup('Latin-Capital_Letter A', loose=True) == 'A'
+        assert index.lookup('hangul jungseong o-e', loose=True) == 'ᆀ'
+        assert index.lookup('hangul jungseong oe', loose=True) == 'ᅬ'
+        assert index.lookup('hangul syllable g a', loose=True) == '가'
+        assert index.lookup('cjk unified ideograph-4e00', loose=True) == '一'
+        assert index.lookup('latin capital letter a with macron and grave', loose=True) == 'Ā̀'
+        self.assertRaises(KeyError, index.lookup, 'latin capital letter -a', loose=True)
+        assert index.code('nul', loose=True) == 0
+
+    def test_name(self):
+        index = self.index
+        assert index.name(0x41) == 'LATIN CAPITAL LETTER A'
+        assert index.name(0xAC01) == 'HANGUL SYLLABLE GAG'
+        assert index.name(0x3400) == 'CJK UNIFIED IDEOGRAPH-3400'
+        assert index.name(0x0000) is None
+        assert index.name(0xE000, '') == ''
+        assert index.name(0x10FFFF) is None
+
+    def test_unicodedata(self):
+        # Names never change, so any later version must agree. Check every
+        # stored name, and a sample of the generated ones.
+        cps = list(self.index._codepoints[0])
+        for low, high, _ in self.index._ranges:
+            cps.extend(range(low, high + 1, 37))
+            cps.append(high)
+        for cp in cps:
+            name = self.index.name(cp)
+            if not name.startswith('TANGUT IDEOGRAPH-'):
+                assert unicodedata.name(chr(cp)) == name
+            assert self.index.code(name) == cp
+            assert self.index.code(name.lower(), loose=True) == cp
+        assert len(self.index) < len(cps)
+
+    def test_lookup_many(self):
+        index = self.index
+        queries = ['NUL', 'BOGUS', 'HANGUL SYLLABLE GA', 'LATIN SMALL LETTER A', 'NUL']
+        assert index.lookup_many(queries) == ['\0', None, '가', 'a', '\0']
+        assert index.lookup_many(['latin small letter a', 'bogus', 'cjk unified ideograph 4e00'], '?', loose=True) == ['a', '?', '一']
+
+    def test_prefix(self):
+        index = self.index
+        items = list(index.prefix('LATIN SMALL LETTER A WITH '))
+        assert items[0] == ('LATIN SMALL LETTER A WITH ACUTE', 'á')
+        assert [k for k, _ in items] == sorted([k for k, _ in items])
+        assert list(index.prefix('HANGUL SYLLABLE GAG'))[:3] == [
+            ('HANGUL SYLLABLE GAG', '각'),
+            ('HANGUL SYLLABLE GAGG', '갂'),
+            ('HANGUL SYLLABLE GAGS', '갃'),
+        ]
+        assert len(list(index.prefix('CJK UNIFIED IDEOGRAPH-4E0'))) == 16
+        assert [k for k, _ in index.prefix('hangul jungseong o-', loose=True)][:3] == ['HANGULJUNGSEONGO', 'HANGULJUNGSEONGO-E', 'HANGULJUNGSEONGOE']
+        assert [k for k, _ in index.prefix('hangul jungseong o-e', loose=True)] == ['HANGULJUNGSEONGO-E']
+        assert list(index.prefix('hangul syllable gag', loose=True))[0] == ('HANGULSYLLABLEGAG', '각')
+        assert list(index.prefix('BOGUS')) == []
+
+    def test_errors(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            new = os.path.join(tmp, '9.0.0/ucd')
+            old = os.path.join(tmp, '8.0.0/ucd')
+            os.makedirs(new)
+            os.makedirs(old)
+            shutil.copy(os.path.join(ucd, 'Jamo.txt'), old)
+            shutil.copy(os.path.join(ucd, 'NameAliases.txt'), new)
+            self.assertRaises(ValueError, names.NameIndex.from_files, [os.path.join(new, 'NameAliases.txt'), os.path.join(old, 'Jamo.txt')])
+            # Even when the same file of another version comes later.
+            shutil.copy(os.path.join(ucd, 'Jamo.txt'), new)
+            self.assertRaises(ValueError, names.NameIndex.from_files, [os.path.join(old, 'Jamo.txt'), os.path.join(new, 'Jamo.txt')])
+            os.unlink(os.path.join(new, 'Jamo.txt'))
+            with open(os.path.join(new, 'UnicodeData.txt'), 'w') as fo:
+                fo.write('AC00;<Hangul Syllable, First>;Lo;0;L;;;;;N;;;;;\n')
+                fo.write('D7A3;<Hangul Syllable, Last>;Lo;0;L;;;;;N;;;;;\n')
+            self.assertRaises(ValueError, names.NameIndex.from_directory, new)
+            with open(os.path.join(new, 'UnicodeData.txt'), 'w') as fo:
+                fo.write('0041;LATIN CAPITAL LETTER A;Lu;0;L;;;;;N;;;;0061;\n')
+                fo.write('0042;LATIN CAPITAL LETTER-A;Lu;0;L;;;;;N;;;;0062;\n')
+            self.assertRaises(ValueError, names.NameIndex.from_directory, new)
+            os.unlink(os.path.join(new, 'NameAliases.txt'))
+            assert len(names.NameIndex.from_files([os.path.join(ucd, 'Blocks.txt')])) == 0
+
+    def test_main(self):
+        out = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(out):
+            names.main([ucd, 'LATIN CAPITAL LETTER A', 'U+AC00', 'U+0000', 'BOGUS', 'LATIN CAPITAL LETTER A WITH MACRON AND GRAVE'], 'uni.names')
+            names.main(['--loose', '--jobs=1', '--cache=' + tmp, ucd, 'latin capital letter a'], 'uni.names')
+        assert out.getvalue() == ''.join([
+            'LATIN CAPITAL LETTER A: U+0041\n',
+            'U+AC00: HANGUL SYLLABLE GA\n',
+            'U+0000: \n',
+            'BOGUS:\n',
+            'LATIN CAPITAL LETTER A WITH MACRON AND GRAVE: U+0100 U+0300\n',
+            'latin capital letter a: U+0041\n',
+        ])
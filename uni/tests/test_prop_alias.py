@@ -0,0 +1,102 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import subprocess
+import sys
+import unittest
+
+from uni import prop_alias as alias, prop_base
+
+
+def run(code):
+    subprocess.check_call([sys.executable, '-c', 'import uni.prop_alias as alias, uni.prop_base as base\n' + code])
+
+
+class TestLazy(unittest.TestCase):
+    def test_module(self):
+        run('''
+import sys
+# Before 3.7, there is no module __getattr__, so everything is built.
+assert ('General_Category' not in vars(alias)) == (sys.version_info >= (3, 7))
+assert alias.General_Category.convert('Lu') is alias.General_Category.Uppercase_Letter
+assert 'Block' in vars(alias)
+assert not hasattr(alias.Block, '__wrapped__')
+assert 'value_list' not in vars(alias.Block)
+assert 'regex' not in vars(alias.X_Element_of_kTotalStrokes)
+''')
+
+    def test_property_per_se(self):
+        run('''
+assert base.PropertyPerSe.convert('sc') is alias.Script
+assert 'Script' in vars(alias)
+''')
+
+    def test_threads(self):
+        # Every thread must wait for the one that is building.
+        run('''
+import threading
+barrier = threading.Barrier(16)
+errors = []
+def first_access(i):
+    barrier.wait()
+    try:
+        if i % 2:
+            assert alias.General_Category.convert('Lu') is alias.General_Category.Uppercase_Letter
+        else:
+            assert base.PropertyPerSe.convert('sc') is alias.Script
+        assert alias.Script.Latin in alias.Script.value_set
+    except BaseException as e:
+        errors.append(e)
+threads = [threading.Thread(target=first_access, args=(i,)) for i in range(16)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+assert not errors, errors
+''')
+
+    def test_retry(self):
+        class Flaky(prop_base._Property):
+            calls = []
+            def _materialize(cls):
+                cls.calls.append(None)
+                if len(cls.calls) == 1:
+                    raise ValueError('first try')
+                # Looking up anything else meanwhile doesn't recurse.
+                assert not hasattr(cls, 'value')
+                cls.value = 1
+        self.assertRaises(ValueError, getattr, Flaky, 'value')
+        assert '_materialize' in vars(Flaky)
+        assert Flaky.value == 1
+        assert '_materialize' not in vars(Flaky)
+        assert len(Flaky.calls) == 2
+
+    def test_all(self):
+        run('''
+from uni.prop_alias import *
+assert General_Category is alias.gc
+''')
+
+    def test_attributes(self):
+        assert 'Script' in dir(alias)
+        assert 'General_Category' in alias.__all__
+        with self.assertRaises(AttributeError):
+            alias.No_Such_Property
+        with self.assertRaises(AttributeError):
+            alias.Script.No_Such_Value
+        with self.assertRaises(AttributeError):
+            prop_base.Bool.No_Such_Value
+        assert alias.Script.Latin in alias.Script.value_set
+        assert alias.X_Element_of_kTotalStrokes.check('12') == '12'
@@ -0,0 +1,111 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import pickle
+import unittest
+
+from uni import prop_alias as alias, prop_base
+
+
+class TestConvertCache(unittest.TestCase):
+    def test_enum(self):
+        cls = alias.Line_Break
+        cls.convert_cache_clear()
+        assert cls.convert_cache_info() == (0, 0, 0)
+        assert cls.convert('AL') is alias.Line_Break.Alphabetic
+        assert cls.convert('AL') is alias.Line_Break.Alphabetic
+        assert cls.convert('alphabetic') is alias.Line_Break.Alphabetic
+        assert cls.convert_cache_info() == prop_base.CacheInfo(1, 2, 2)
+        with self.assertRaises(AssertionError):
+            cls.convert('No_Such_Value')
+        assert cls.convert_cache_info() == (1, 2, 2)
+
+    def test_bool(self):
+        cls = alias.White_Space
+        cls.convert_cache_clear()
+        assert cls.convert('Y') is True
+        assert cls.convert('N') is False
+        assert cls.convert('Y') is True
+        assert cls.convert_cache_info() == (1, 2, 2)
+        assert prop_base.Bool.convert_cache_info().currsize == 0
+
+    def test_property(self):
+        cls = prop_base.PropertyPerSe
+        assert cls.convert('gc') is alias.General_Category
+        assert cls.convert('gc') is alias.General_Category
+        assert cls.convert_cache_info().hits >= 1
+
+    def test_subclass(self):
+        class Yes(alias.White_Space):
+            pass
+        alias.White_Space.convert_cache_clear()
+        assert alias.White_Space.convert('Y') is True
+        assert Yes.convert_cache_info() == (0, 0, 0)
+        assert Yes._convert_cache is not alias.White_Space._convert_cache
+
+
+class TestBitSet(unittest.TestCase):
+    def test_convert(self):
+        cls = alias.Script_Extensions
+        Script = alias.Script
+        x = cls.convert('Arab Syrc')
+        assert type(x) is cls.bitset
+        assert len(x) == 2
+        assert list(x) == sorted([Script.Arabic, Script.Syriac], key=lambda v: v.bit)
+        assert Script.Arabic in x and Script.Latin not in x
+        assert alias.Line_Break.Alphabetic not in x
+        assert repr(cls.bitset()) == 'Script_Extensions.bitset()'
+        assert cls.bitset.from_mask(int(x)) == x
+        assert alias.kSimplifiedVariant.bitset is None
+        assert alias.kSimplifiedVariant.convert('U+4E00 U+4E01') == {0x4E00, 0x4E01}
+
+    def test_ops(self):
+        cls = alias.Script_Extensions.bitset
+        Script = alias.Script
+        x = cls([Script.Arabic, Script.Syriac])
+        y = cls([Script.Latin, Script.Arabic])
+        e = cls()
+        assert x | y == cls([Script.Arabic, Script.Syriac, Script.Latin])
+        assert x & y == cls([Script.Arabic])
+        assert x ^ y == cls([Script.Syriac, Script.Latin])
+        assert x - y == cls([Script.Syriac])
+        for r in [x | y, x & y, x ^ y, x - y]:
+            assert type(r) is cls
+        assert x != y and not x == y
+        assert e < x < x | y and x | y > x > e
+        assert x <= x and x >= x and not x < x and not x > x
+        assert not x <= y and not x >= y
+        assert x.isdisjoint(cls([Script.Latin]))
+        assert not x.isdisjoint(y)
+        assert len({x, cls([Script.Syriac, Script.Arabic])}) == 1
+        other = alias.X_Casing_Conditions.bitset()
+        # Plain ints are masks.
+        assert x == int(x)
+        assert e != other
+        for op in ['__or__', '__and__', '__xor__', '__sub__', '__le__', '__lt__', '__ge__', '__gt__']:
+            assert getattr(x, op)(int(x)) is NotImplemented
+        assert 1 | x == int(x) | 1
+        with self.assertRaises(TypeError):
+            x.isdisjoint(other)
+        # Not numbers, so never "adjacent" in a map.
+        with self.assertRaises(TypeError):
+            x + 1
+        with self.assertRaises(TypeError):
+            1 + x
+
+    def test_pickle(self):
+        x = alias.Script_Extensions.convert('Grek Latn')
+        y = pickle.loads(pickle.dumps(x, pickle.HIGHEST_PROTOCOL))
+        assert type(y) is type(x) and y == x
@@ -0,0 +1,117 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+''' Text files read straight out of compressed archives.
+
+UCD.zip and Unihan.zip, as well as single compressed files (.txt.gz,
+.txt.xz, .txt.bz2), are never extracted: each member is decoded as it is
+read, and its lines go straight to `Schema.load`. Members are named as if
+the archive had been extracted next to itself (e.g. `9.0.0/ucd/UCD.zip`
+has `9.0.0/ucd/extracted/DerivedAge.txt`), so that their schema and
+version are found just like for plain files.
+
+There is no decoder for .Z (compress) files in the standard library, so
+they are still skipped.
+'''
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zipfile
+
+from .schema import _schemas, get_encoding, get_schema_info
+
+
+_OPENERS = {
+    '.bz2': bz2.open,
+    '.gz': gzip.open,
+    '.xz': lzma.open,
+}
+
+
+def is_archive(fn):
+    ext = os.path.splitext(fn)[1].lower()
+    return ext == '.zip' or ext in _OPENERS
+
+
+def iter_members(fn):
+    ''' Yield (name, binary file) for each file in an archive.
+
+        Each file is closed when the next one is produced.
+    '''
+    base, ext = os.path.splitext(fn)
+    ext = ext.lower()
+    if ext == '.zip':
+        d = os.path.dirname(fn)
+        with zipfile.ZipFile(fn) as zf:
+            for info in zf.infolist():
+                if info.filename.endswith('/'):
+                    continue
+                with zf.open(info) as fo:
+                    yield os.path.join(d, info.filename), fo
+    else:
+        with _OPENERS[ext](fn) as fo:
+            yield base, fo
+
+
+def member_names(fn):
+    ''' Return the names that iter_members would produce.
+    '''
+    return [name for name, _ in iter_members(fn)]
+
+
+def decode(name, fo):
+    ''' Return (schema, version, text file) for a member, or None if it
+        has no schema (e.g. test data or PDFs).
+    '''
+    sn, ext, ver = get_schema_info(name)
+    if ver is None or sn.startswith('diff') or ext.lower() != '.txt':
+        return None
+    schema = _schemas[sn]
+    if schema is None:
+        return None
+    encoding, errors = get_encoding(sn, ext, ver)
+    return schema, ver, io.TextIOWrapper(fo, encoding=encoding, errors=errors, newline='')
+
+
+def load_archive(fn):
+    ''' Yield (name, version, rows) for each member of an archive that
+        has a schema.
+
+        The rows are parsed while the member is read, so they must be
+        consumed before the next member is produced (or this generator is
+        closed).
+    '''
+    for name, fo in iter_members(fn):
+        decoded = decode(name, fo)
+        if decoded is None:
+            continue
+        schema, ver, text = decoded
+        yield name, ver, schema.load(text, ver, name=name)
+
+
+def load_member(fn, name):
+    ''' Parse one member of an archive, returning a list of rows, or None
+        if it has no schema.
+    '''
+    for member, fo in iter_members(fn):
+        if member == name:
+            decoded = decode(name, fo)
+            if decoded is None:
+                return None
+            schema, ver, text = decoded
+            return list(schema.load(text, ver, name=name))
+    raise KeyError(name)
@@ -0,0 +1,166 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+''' Compiled binary snapshots of parsed text files.
+
+Parsing the text format is slow, so the rows produced by `Schema.load` can
+be saved in a cache directory and streamed back by later processes.
+
+Snapshots are keyed by schema name, version, and a hash of the source file,
+so editing (or replacing) a file never returns stale rows.
+'''
+import hashlib
+import os
+import pickle
+
+
+# Bump this whenever the rows produced by `Schema.load` change shape.
+FORMAT_VERSION = 2
+
+_MAGIC = b'uni.txt.cache\n'
+_BATCH_SIZE = 1024
+# The empty batch that ends every snapshot.
+_END = pickle.dumps([], pickle.HIGHEST_PROTOCOL)
+
+
+def file_digest(fn):
+    ''' Return the hex sha256 of the contents of a file.
+    '''
+    h = hashlib.sha256()
+    with open(fn, 'rb') as fo:
+        for chunk in iter(lambda: fo.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_path(cache_dir, schema, version, digest):
+    sn = schema.name.replace('/', '_')
+    return os.path.join(cache_dir, '%s-%d.%d.%d-%s.pickle' % ((sn,) + tuple(version) + (digest[:32],)))
+
+
+def _header(schema, version, digest):
+    return (FORMAT_VERSION, schema.name, tuple(version), digest)
+
+
+def _read(path, header):
+    ''' Yield the rows from a snapshot, or nothing if it is invalid.
+
+        Since the header and the end of the file are checked before any
+        rows are produced, callers can tell the two cases apart.
+    '''
+    try:
+        fo = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with fo:
+        if fo.read(len(_MAGIC)) != _MAGIC:
+            return
+        try:
+            if pickle.load(fo) != header:
+                return
+        except Exception:
+            return
+        # Snapshots are renamed into place once complete, but may still
+        # have been cut short since (e.g. by a full disk while copying).
+        start = fo.tell()
+        fo.seek(-len(_END), os.SEEK_END)
+        if fo.tell() < start or fo.read() != _END:
+            return
+        fo.seek(start)
+        yield True
+        while True:
+            batch = pickle.load(fo)
+            if not batch:
+                break
+            yield from batch
+
+
+def _write(path, header, rows):
+    ''' Yield the rows, while saving them to a new snapshot.
+
+        The snapshot is only created if the rows are completely consumed.
+    '''
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        with open(tmp, 'wb') as fo:
+            fo.write(_MAGIC)
+            pickle.dump(header, fo, pickle.HIGHEST_PROTOCOL)
+            batch = []
+            for row in rows:
+                batch.append(row)
+                yield row
+                if len(batch) == _BATCH_SIZE:
+                    pickle.dump(batch, fo, pickle.HIGHEST_PROTOCOL)
+                    batch = []
+            if batch:
+                pickle.dump(batch, fo, pickle.HIGHEST_PROTOCOL)
+            fo.write(_END)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp) # pragma: no cover
+
+
+def load(schema, fo, version, cache_dir, *, name=None):
+    ''' Like `schema.load(fo, version)`, but using a snapshot if possible.
+
+        `fo` must be a real file, since its name is used to hash it.
+    '''
+    digest = file_digest(fo.name)
+    path = cache_path(cache_dir, schema, version, digest)
+    header = _header(schema, version, digest)
+    rows = _read(path, header)
+    if next(rows, False):
+        return rows
+    return _write(path, header, schema.load(fo, version, name=name))
+
+
+def compile(fn, cache_dir):
+    ''' Create (or refresh) the snapshot for a single file.
+
+        Return the path of the snapshot, or None if the file has no schema.
+    '''
+    from .schema import get_schema_info, get_encoding, _schemas
+    sn, ext, ver = get_schema_info(fn)
+    if ver is None or ext.lower() != '.txt':
+        return None # pragma: no cover
+    schema = _schemas.get(sn)
+    if schema is None:
+        return None
+    encoding, errors = get_encoding(sn, ext, ver)
+    with open(fn, encoding=encoding, errors=errors, newline='') as fo:
+        for _ in load(schema, fo, ver, cache_dir):
+            pass
+        return cache_path(cache_dir, schema, ver, file_digest(fn))
+
+
+def main(args=None, exe=None):
+    import sys
+    if args is None:
+        args = sys.argv[1:]
+    if exe is None:
+        exe = sys.argv[0]
+    if len(args) < 2 or any([a.startswith('-') for a in args]):
+        sys.exit('Usage: %s cache-dir ucd/*.txt' % exe) # pragma: no cover
+    cache_dir = args[0]
+    for fn in args[1:]:
+        path = compile(fn, cache_dir)
+        if path is not None:
+            print(path)
+
+
+if __name__ == '__main__':
+    main()
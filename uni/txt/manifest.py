@@ -0,0 +1,184 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+''' Manifests of parsed files, for re-parsing only what changed.
+
+A manifest records, for each file, a hash of its contents, a hash of the
+rows `Schema.load` produced from it, and the properties those rows have
+values for. Each member of a .zip archive gets its own entry, named as if
+the archive were a directory (e.g. `9.0.0/ucd/UCD.zip/Blocks.txt`), but
+shares the hash of the archive's contents. Refreshing it reparses only the files whose contents changed
+(or all of them, if the parser itself changed), and reports which files
+changed and which per-property tables (e.g. `uni.db` columns) must be
+rebuilt. Files that changed only in their comments rebuild nothing.
+'''
+import collections
+import functools
+import hashlib
+import json
+import os
+
+from .. import prop_alias as alias, prop_base as base
+from . import cache
+from .schema import _map, _schemas, expand_archives, get_schema_info, load_file
+
+
+# Bump this whenever the contents of a manifest change meaning.
+FORMAT_VERSION = 1
+
+Entry = collections.namedtuple('Entry', 'digest output tables')
+Report = collections.namedtuple('Report', 'unchanged reparsed added removed tables')
+
+
+def _format():
+    # Rows change shape whenever snapshots do.
+    return [FORMAT_VERSION, cache.FORMAT_VERSION]
+
+
+def load(path):
+    ''' Return (entries by file name, whether they are from this parser).
+    '''
+    try:
+        fo = open(path)
+    except FileNotFoundError:
+        return {}, True
+    with fo:
+        data = json.load(fo)
+    entries = {fn: Entry(e['digest'], e['output'], tuple(e['tables'])) for fn, e in data['files'].items()}
+    return entries, data['format'] == _format()
+
+
+def save(path, entries):
+    data = {
+        'format': _format(),
+        'files': {fn: e._asdict() for fn, e in sorted(entries.items())},
+    }
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'w') as fo:
+        json.dump(data, fo, indent=1, sort_keys=True)
+        fo.write('\n')
+    os.replace(tmp, path)
+
+
+def _tables(schema, rows):
+    ''' Return the sorted names of the properties that rows have values for.
+    '''
+    fields = schema.required_fields + schema.opt_fields
+    rv = {cls.__name__ for cls in fields if isinstance(cls, type) and cls.__module__ == alias.__name__}
+    per_se = [i for i, cls in enumerate(fields) if cls is base.PropertyPerSe]
+    for row in rows:
+        for i in per_se:
+            rv.add(row[i].__name__)
+    return tuple(sorted(rv))
+
+
+def _parse(item, cache_dir):
+    ''' Return (output digest, tables) for a (name, source) pair from
+        expand_archives, or (None, ()) if it has no schema.
+    '''
+    name, source = item
+    rows = load_file(source, cache_dir=cache_dir)
+    if rows is None:
+        return None, ()
+    h = hashlib.sha256()
+    for row in rows:
+        h.update(repr(row).encode('utf-8'))
+        h.update(b'\n')
+    return h.hexdigest(), _tables(_schemas[get_schema_info(name)[0]], rows)
+
+
+def refresh(path, files, *, jobs=1, cache_dir=None):
+    ''' Bring the manifest at `path` up to date with `files`, parsing only
+        the files that changed, and return a Report.
+
+        `files` is the complete set: files that are in the manifest but
+        not in `files` are reported as removed.
+    '''
+    old, current = load(path)
+    entries = {}
+    unchanged = []
+    todo = []
+    digests = {}
+    for name, source in expand_archives(files):
+        if isinstance(source, tuple):
+            archive = source[0]
+            fn = os.path.join(archive, os.path.relpath(name, os.path.dirname(archive)))
+        else:
+            archive = fn = source
+        digest = digests.get(archive)
+        if digest is None:
+            digest = digests[archive] = cache.file_digest(archive)
+        entry = old.get(fn)
+        if current and entry is not None and entry.digest == digest:
+            entries[fn] = entry
+            unchanged.append(fn)
+        else:
+            todo.append((fn, (name, source), digest))
+    reparsed = []
+    added = []
+    tables = set()
+    results = _map(functools.partial(_parse, cache_dir=cache_dir), [item for _, item, _ in todo], jobs)
+    for (fn, _, digest), (output, file_tables) in zip(todo, results):
+        entries[fn] = Entry(digest, output, file_tables)
+        prev = old.get(fn)
+        if prev is None:
+            added.append(fn)
+            tables.update(file_tables)
+            continue
+        reparsed.append(fn)
+        if (prev.output, prev.tables) != (output, file_tables):
+            tables.update(prev.tables)
+            tables.update(file_tables)
+    removed = sorted(set(old) - set(entries))
+    for fn in removed:
+        tables.update(old[fn].tables)
+    save(path, entries)
+    return Report(unchanged, reparsed, added, removed, sorted(tables))
+
+
+def print_report(report, file=None):
+    for fn in report.added:
+        print('added', fn, file=file)
+    for fn in report.reparsed:
+        print('reparsed', fn, file=file)
+    for fn in report.removed:
+        print('removed', fn, file=file)
+    print('unchanged %d files' % len(report.unchanged), file=file)
+    for table in report.tables:
+        print('rebuild', table, file=file)
+
+
+def main(args=None, exe=None):
+    import sys
+    if args is None:
+        args = sys.argv[1:]
+    if exe is None:
+        exe = sys.argv[0]
+    kwargs = {}
+    while args:
+        if args[0].startswith('--cache='):
+            kwargs['cache_dir'] = args[0][len('--cache='):]
+        elif args[0].startswith('--jobs='):
+            kwargs['jobs'] = int(args[0][len('--jobs='):]) or None
+        else:
+            break
+        del args[0]
+    if len(args) < 2 or any([a.startswith('-') for a in args]):
+        sys.exit('Usage: %s [--cache=DIR] [--jobs=N (0 for all cores)] manifest.json ucd/*.txt' % exe) # pragma: no cover
+    print_report(refresh(args[0], args[1:], **kwargs))
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,8 @@
 #
 #   You should have received a copy of the GNU Lesser General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import functools
+import io
 import itertools
 import os
 
@@ -53,6 +55,7 @@ class Schema:
         self.terminator = terminator
         self.min_unicode_version = min
         self.max_unicode_version = max
+        self._parsers = {} # by version
 
     def __repr__(self):
         num_fields = '%d' % len(self.required_fields)
@@ -62,10 +65,23 @@ class Schema:
             num_fields += '+%d*' % len(self.repeat_fields)
         return '<Schema (%s) since %r for %r>' % (num_fields, self.min_unicode_version, self.name)
 
-    def load(self, fo, version, *, name=None):
+    def load(self, fo, version, *, name=None, cache_dir=None):
+        ''' Parse the lines of `fo`, yielding a list of fields for each row.
+
+            If `cache_dir` is given, the rows are streamed from a compiled
+            snapshot instead (which is created if it doesn't exist yet).
+        '''
+        if cache_dir is not None:
+            from . import cache
+            return cache.load(self, fo, version, cache_dir, name=name)
+        return self._load(fo, version, name=name)
+
+    def _load(self, fo, version, *, name=None):
         if name is None:
             name = fo.name
         assert self.min_unicode_version <= version <= self.max_unicode_version, (name, version)
+        parse = self._get_parser(version)
+        is_unicode_data = self.name == 'UnicodeData'
         for line in fo:
             assert line[-1] == '\n' or (line, self.name, version) in (
                 ('\t', 'Blocks', v('0.0.0')),
@@ -75,64 +91,10 @@ class Schema:
             if line.endswith('\r') and False:
                 # TODO: turn off "universal newlines" support and check this.
                 line = line[:-1] # pragma: no cover
-            assert '\r' not in line, (name, line)
-            if self.comments or (self.name, version) in (
-                    ('UnicodeData', v('1.0.0')),
-                    ('UnicodeData', v('1.0.1')),
-                    ('UnicodeData', v('1.1.5')),
-            ):
-                line, _, comment = line.partition('#')
-                line = line.rstrip()
-                if not line:
-                    continue
-            else:
-                assert '#' not in line, (name, line)
-            assert '"' not in line, (name, line)
-            fields = line.split(self.separator)
-            if self.spaces or (self.name, version) in (
-                    ('UnicodeData', v('1.1.5')),
-                    ('UnicodeData', v('4.0.0')),
-                    ('Index', v('3.2.0')),
-                    ('Index', v('4.0.0')),
-                    ('Index', v('4.0.1')),
-                    ('Index', v('4.1.0')),
-            ):
-                fields = [f.strip() for f in fields]
-            else:
-                assert all([f == f.strip() for f in fields]), (name, line)
-            if self.terminator:
-                assert fields[-1] == ''
-                fields.pop()
-            assert len(self.required_fields) <= len(fields), (name, line)
-            if not self.repeat_fields:
-                assert len(fields) <= len(self.required_fields) + len(self.opt_fields), (name, line)
-            i = 0
-            if self.required_fields:
-                for i, c in enumerate(self.required_fields, 0):
-                    c = _fix_ref(c, fields)
-                    fields[i] = c.convert(fields[i]) if fields[i] != self.missing else None
-                i += 1
-            if self.opt_fields:
-                for i, c in enumerate(self.opt_fields, i):
-                    c = _fix_ref(c, fields)
-                    if i == len(fields):
-                        fields.append(None)
-                        continue
-                    fields[i] = c.convert(fields[i]) if fields[i] != self.missing else None
-                i += 1
-            if self.repeat_fields:
-                i0 = i
-                for i, c in enumerate(itertools.cycle(self.repeat_fields), i):
-                    c = _fix_ref(c, fields)
-                    if i == len(fields):
-                        break
-                    assert fields[i]
-                    fields[i] = c.convert(fields[i])
-                i = i0
-                fields[i:] = [fields[i:]] # ensure that the result is fixed-length
-                i += 1
-            assert i == len(fields), (i, len(fields), name, line)
-            if self.name == 'UnicodeData':
+            fields = parse(line, name)
+            if fields is None:
+                continue
+            if is_unicode_data:
                 if fields[1].endswith(', First>'):
                     # See how much simpler it is when we don't have to deal with everything?
                     fields2 = [c.convert(f) if f != '' else None for c, f in zip(self.required_fields, next(fo).rstrip().split(';'))]
@@ -145,6 +107,94 @@ class Schema:
                     fields[5] = (None, None)
             yield fields
 
+    def _get_parser(self, version):
+        try:
+            return self._parsers[version]
+        except KeyError:
+            rv = self._parsers[version] = self._make_parser(version)
+            return rv
+
+    def _make_parser(self, version):
+        ''' Build a function to convert one line (without the newline).
+
+            It returns the list of fields, or None if the line is blank.
+
+            Everything that only depends on the schema and version is
+            decided here, once, rather than for every line.
+        '''
+        comments = self.comments or (self.name, version) in (
+                ('UnicodeData', v('1.0.0')),
+                ('UnicodeData', v('1.0.1')),
+                ('UnicodeData', v('1.1.5')),
+        )
+        spaces = self.spaces or (self.name, version) in (
+                ('UnicodeData', v('1.1.5')),
+                ('UnicodeData', v('4.0.0')),
+                ('Index', v('3.2.0')),
+                ('Index', v('4.0.0')),
+                ('Index', v('4.0.1')),
+                ('Index', v('4.1.0')),
+        )
+        separator = self.separator
+        missing = self.missing
+        terminator = self.terminator
+        num_required = len(self.required_fields)
+        fixed = self.required_fields + self.opt_fields
+        num_fixed = len(fixed)
+        repeat = self.repeat_fields
+        # Columns whose type depends on another column are rare.
+        has_refs = any([isinstance(c, _ref) for c in fixed + repeat])
+        convs = [c if isinstance(c, _ref) else c.convert for c in fixed]
+        if missing is None:
+            # The fields are all strings, so nothing is ever missing.
+            missing = object()
+
+        def convert_fixed(fields):
+            if not has_refs:
+                return [conv(f) if f != missing else None for conv, f in zip(convs, fields)]
+            rv = []
+            for conv, f in zip(convs, fields):
+                if isinstance(conv, _ref):
+                    conv = _fix_ref(conv, rv).convert
+                rv.append(conv(f) if f != missing else None)
+            return rv
+
+        def convert_repeat(fields, rv):
+            rest = []
+            for c, f in zip(itertools.cycle(repeat), fields[num_fixed:]):
+                c = _fix_ref(c, rv)
+                assert f
+                rest.append(c.convert(f))
+            rv.append(rest) # ensure that the result is fixed-length
+            return rv
+
+        def parse(line, name):
+            assert '\r' not in line, (name, line)
+            if comments:
+                line = line.partition('#')[0].rstrip()
+                if not line:
+                    return None
+            else:
+                assert '#' not in line, (name, line)
+            assert '"' not in line, (name, line)
+            fields = line.split(separator)
+            if spaces:
+                fields = [f.strip() for f in fields]
+            else:
+                assert all([f == f.strip() for f in fields]), (name, line)
+            if terminator:
+                assert fields[-1] == ''
+                fields.pop()
+            assert num_required <= len(fields), (name, line)
+            rv = convert_fixed(fields)
+            if repeat:
+                return convert_repeat(fields, rv)
+            assert len(fields) <= num_fixed, (name, line)
+            if len(rv) < num_fixed:
+                rv.extend([None] * (num_fixed - len(rv)))
+            return rv
+        return parse
+
 
 def _add_schema(*args, **kwargs):
     aliases = args[0]
@@ -476,12 +526,92 @@ def get_encoding(sn, ext, ver):
     return 'utf-8', errors
 
 
-def main_dump_file(fn, sample):
+def expand_archives(files):
+    ''' Yield (name, source) for each file, and for each member of the
+        .zip archives among them.
+
+        The name is what to pass to get_schema_info, and the source what
+        to pass to load_file.
+    '''
+    from . import archive
+    for fn in files:
+        if not archive.is_archive(fn):
+            yield fn, fn
+        elif os.path.splitext(fn)[1].lower() == '.zip':
+            for name in archive.member_names(fn):
+                yield name, (fn, name)
+        else:
+            yield os.path.splitext(fn)[0], fn
+
+
+def load_file(fn, *, cache_dir=None):
+    ''' Parse an entire file, returning a list of rows.
+
+        The file may be compressed, or be an (archive, member) pair from
+        expand_archives. A whole .zip is a ValueError, since it holds
+        many files.
+
+        Return None if the file has no schema (e.g. test data or PDFs).
+    '''
+    from . import archive
+    if isinstance(fn, tuple):
+        return archive.load_member(*fn)
+    if archive.is_archive(fn):
+        if os.path.splitext(fn)[1].lower() == '.zip':
+            raise ValueError('%s holds many files, use expand_archives' % fn)
+        # Snapshots are keyed by the file, which we'd have to read twice.
+        for _, _, rows in archive.load_archive(fn):
+            return list(rows)
+        return None
+    sn, ext, ver = get_schema_info(fn)
+    if ver is None or sn.startswith('diff') or ext.lower() != '.txt':
+        return None
+    schema = _schemas[sn]
+    if schema is None:
+        return None
+    encoding, errors = get_encoding(sn, ext, ver)
+    with open(fn, encoding=encoding, errors=errors, newline='') as fo:
+        return list(schema.load(fo, ver, cache_dir=cache_dir))
+
+
+def _map(func, iterable, jobs):
+    ''' Like map(), but spread over `jobs` processes (None for all cores).
+
+        Results are still produced in order.
+    '''
+    if jobs == 1:
+        yield from map(func, iterable)
+        return
+    import multiprocessing
+    with multiprocessing.Pool(jobs) as pool:
+        yield from pool.imap(func, iterable, chunksize=1)
+
+
+def load_files(files, *, jobs=None, cache_dir=None):
+    ''' Parse many files in parallel, returning a list of rows per file.
+
+        The result is in the same order as `files`, with None for files
+        that have no schema.
+    '''
+    return list(_map(functools.partial(load_file, cache_dir=cache_dir), files, jobs))
+
+
+def main_dump_file(fn, sample, *, cache_dir=None, file=None):
+    from . import archive
+    if archive.is_archive(fn):
+        # Members are dumped as they are decompressed, without snapshots.
+        for name, fo in archive.iter_members(fn):
+            _dump_file(name, functools.partial(io.TextIOWrapper, fo, newline=''), sample, cache_dir=None, file=file)
+        return
+    _dump_file(fn, functools.partial(open, fn, newline=''), sample, cache_dir=cache_dir, file=file)
+
+
+def _dump_file(fn, opener, sample, *, cache_dir, file):
     sn, ext, ver = get_schema_info(fn)
     if ver is None:
         return
     encoding, errors = get_encoding(sn, ext, ver)
-    print('#', sn, ver, encoding)
+    print('#', sn, ver, encoding, file=file)
     if encoding is None:
         return # pragma: no cover
     if sn.startswith('diff') or ext.lower() != '.txt':
@@ -490,31 +620,60 @@ def main_dump_file(fn, sample):
     if schema is None:
         return
     repr(schema)
-    with open(fn, encoding=encoding, errors=errors, newline='') as fo:
-        name = None
+    with opener(encoding=encoding, errors=errors) as fo:
+        name = fn
         if sample and sn not in {'PropertyAliases', 'PropertyValueAliases', 'UnicodeData', 'Index'}:
             from .._util import ordered_sample
-            name = fo.name
             fo = [x for x in fo if x.split('#', 1)[0].strip()]
             if len(fo) > 100:
                 fo = ordered_sample(fo, 100)
-        for fields in schema.load(fo, ver, name=name):
-            print(*[repr(f) for f in fields])
+            cache_dir = None # the snapshot is of the whole file
+        for fields in schema.load(fo, ver, name=name, cache_dir=cache_dir):
+            print(*[repr(f) for f in fields], file=file)
+
+
+def _main_dump_file_str(fn, sample, cache_dir):
+    out = io.StringIO()
+    main_dump_file(fn, sample, cache_dir=cache_dir, file=out)
+    return out.getvalue()
 
 
 def main(files=None, exe=None):
     import sys
     if files is None:
         files = sys.argv[1:]
-    sample = files[0] == '--sample'
-    if sample:
+    sample = False
+    cache_dir = None
+    manifest = None
+    jobs = 1
+    while files:
+        if files[0] == '--sample':
+            sample = True
+        elif files[0].startswith('--cache='):
+            cache_dir = files[0][len('--cache='):]
+        elif files[0].startswith('--manifest='):
+            manifest = files[0][len('--manifest='):]
+        elif files[0].startswith('--jobs='):
+            jobs = int(files[0][len('--jobs='):]) or None
+        else:
+            break
         del files[0]
     if exe is None:
         exe = sys.argv[0]
     if not files or any([fn.startswith('-') for fn in files]):
-        sys.exit('Usage: %s [--sample] ucd/*.txt' % exe) # pragma: no cover
-    for fn in files:
-        main_dump_file(fn, sample=sample)
+        sys.exit('Usage: %s [--sample] [--cache=DIR] [--manifest=FILE] [--jobs=N (0 for all cores)] ucd/*.txt' % exe) # pragma: no cover
+    if manifest is not None:
+        # Only dump the files that changed; with --cache, they are only
+        # parsed once.
+        from . import manifest as _manifest
+        report = _manifest.refresh(manifest, files, jobs=jobs, cache_dir=cache_dir)
+        _manifest.print_report(report, file=sys.stderr)
+        changed = set(report.reparsed + report.added)
+        # The entries of a .zip are named after its members.
+        files = [fn for fn in files if fn in changed or any([c.startswith(os.path.join(fn, '')) for c in changed])]
+    func = functools.partial(_main_dump_file_str, sample=sample, cache_dir=cache_dir)
+    for text in _map(func, files, jobs):
+        sys.stdout.write(text)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,115 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import bz2
+import gzip
+import io
+import lzma
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from uni.txt import archive, schema
+
+
+ucd = os.path.join(os.path.dirname(__file__), '../../../www.unicode.org/Public/9.0.0/ucd')
+
+
+class TestArchive(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.ucd = os.path.join(cls.tmp.name, '9.0.0/ucd')
+        os.makedirs(cls.ucd)
+        with zipfile.ZipFile(os.path.join(cls.ucd, 'UCD.zip'), 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('extracted/', '')
+            for f in ['Blocks.txt', 'ReadMe.txt', 'extracted/DerivedLineBreak.txt']:
+                zf.write(os.path.join(ucd, f), f)
+            zf.write(os.path.join(ucd, '../charts/index.html'), 'index.html')
+        with zipfile.ZipFile(os.path.join(cls.ucd, 'Unihan.zip'), 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.write(os.path.join(ucd, 'Unihan_NumericValues.txt'), 'Unihan_NumericValues.txt')
+        with zipfile.ZipFile(os.path.join(cls.ucd, 'Names.zip'), 'w', zipfile.ZIP_DEFLATED) as zf:
+            for f in ['NameAliases.txt', 'NamedSequences.txt']:
+                zf.write(os.path.join(ucd, f), f)
+        for f, opener in [('Jamo.txt.gz', gzip.open), ('Blocks.txt.xz', lzma.open), ('Scripts.txt.bz2', bz2.open), ('ReadMe.txt.gz', gzip.open)]:
+            with open(os.path.join(ucd, f.rsplit('.', 1)[0]), 'rb') as fi, opener(os.path.join(cls.ucd, f), 'wb') as fo:
+                shutil.copyfileobj(fi, fo)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_is_archive(self):
+        assert archive.is_archive('UCD.zip')
+        assert archive.is_archive('Blocks.txt.GZ')
+        assert not archive.is_archive('Blocks.txt')
+        assert not archive.is_archive('Blocks.txt.Z')
+
+    def test_zip(self):
+        # Directories and files without a schema are skipped.
+        members = [(name, ver, list(rows)) for name, ver, rows in archive.load_archive(os.path.join(self.ucd, 'UCD.zip'))]
+        assert [os.path.relpath(name, self.ucd) for name, _, _ in members] == ['Blocks.txt', 'extracted/DerivedLineBreak.txt']
+        for name, ver, rows in members:
+            assert str(ver) == 'v9.0.0'
+            assert rows == schema.load_file(os.path.join(ucd, os.path.relpath(name, self.ucd)))
+        members = archive.load_archive(os.path.join(self.ucd, 'Unihan.zip'))
+        name, ver, rows = next(members)
+        assert list(rows) == schema.load_file(os.path.join(ucd, 'Unihan_NumericValues.txt'))
+
+    def test_compressed(self):
+        for f in ['Jamo.txt.gz', 'Blocks.txt.xz', 'Scripts.txt.bz2']:
+            assert schema.load_file(os.path.join(self.ucd, f)) == schema.load_file(os.path.join(ucd, f.rsplit('.', 1)[0]))
+        assert schema.load_file(os.path.join(self.ucd, 'ReadMe.txt.gz')) is None
+        # A whole .zip can't be one list of rows, so its members are expanded.
+        fn = os.path.join(self.ucd, 'UCD.zip')
+        with self.assertRaises(ValueError):
+            schema.load_file(fn)
+        expanded = list(schema.expand_archives([fn, os.path.join(self.ucd, 'Jamo.txt.gz'), os.path.join(ucd, 'Jamo.txt')]))
+        assert [os.path.relpath(name, self.ucd) for name, _ in expanded[:4]] == ['Blocks.txt', 'ReadMe.txt', 'extracted/DerivedLineBreak.txt', 'index.html']
+        assert expanded[4] == (os.path.join(self.ucd, 'Jamo.txt'), os.path.join(self.ucd, 'Jamo.txt.gz'))
+        assert expanded[5] == (os.path.join(ucd, 'Jamo.txt'),) * 2
+        rows = schema.load_files([source for _, source in expanded], jobs=1)
+        assert rows[0] == schema.load_file(os.path.join(ucd, 'Blocks.txt'))
+        assert rows[1] is None and rows[3] is None
+        assert rows[2] == schema.load_file(os.path.join(ucd, 'extracted/DerivedLineBreak.txt'))
+        assert rows[4] == rows[5]
+        with self.assertRaises(KeyError):
+            archive.load_member(fn, os.path.join(self.ucd, 'Scripts.txt'))
+
+    def test_entry_points(self):
+        from uni import db, names
+        files = ['Blocks.txt', 'extracted/DerivedLineBreak.txt', 'Unihan_NumericValues.txt', 'Jamo.txt', 'Scripts.txt', 'NameAliases.txt', 'NamedSequences.txt']
+        packed = db.Database.from_directory(self.ucd)
+        plain = db.Database.from_files([os.path.join(ucd, f) for f in files])
+        assert packed.properties() == plain.properties()
+        assert 'Line_Break' in [p.__name__ for p in packed.properties()]
+        for cp in [0x41, 0x1100, 0x4E00, 0x10FFFF]:
+            assert packed.record(cp) == plain.record(cp)
+        index = names.NameIndex.from_directory(self.ucd)
+        assert index.lookup('LATIN CAPITAL LETTER GHA') == '\u01a2'
+        assert index.lookup('LATIN CAPITAL LETTER A WITH MACRON AND GRAVE') == '\u0100\u0300'
+
+    def test_dump(self):
+        out = io.StringIO()
+        schema.main_dump_file(os.path.join(self.ucd, 'UCD.zip'), False, file=out)
+        expected = io.StringIO()
+        for f in ['Blocks.txt', 'ReadMe.txt', 'extracted/DerivedLineBreak.txt']:
+            schema.main_dump_file(os.path.join(ucd, f), False, file=expected)
+        assert out.getvalue() == expected.getvalue() + '# index v9.0.0 None\n'
+        out = io.StringIO()
+        schema.main_dump_file(os.path.join(self.ucd, 'Jamo.txt.gz'), True, file=out)
+        assert out.getvalue().splitlines()[:2] == ['# Jamo v9.0.0 utf-8', '(4352, 4352) Jamo_Short_Name.G']
@@ -0,0 +1,114 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from uni.txt import cache, schema
+
+
+ucd = os.path.join(os.path.dirname(__file__), '../../../www.unicode.org/Public/9.0.0/ucd')
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ucd = os.path.join(self.tmp.name, '9.0.0/ucd')
+        os.makedirs(self.ucd)
+        shutil.copy(os.path.join(ucd, 'Scripts.txt'), self.ucd)
+        self.fn = os.path.join(self.ucd, 'Scripts.txt')
+        self.cache_dir = os.path.join(self.tmp.name, 'cache')
+        self.schema = schema._schemas['Scripts']
+        self.version = schema.get_schema_info(self.fn)[2]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def load(self):
+        with open(self.fn, encoding='utf-8', newline='') as fo:
+            return list(cache.load(self.schema, fo, self.version, self.cache_dir))
+
+    def snapshots(self):
+        return sorted(os.listdir(self.cache_dir)) if os.path.exists(self.cache_dir) else []
+
+    def test_miss(self):
+        fresh = schema.load_file(self.fn)
+        digest = cache.file_digest(self.fn)
+        path = cache.cache_path(self.cache_dir, self.schema, self.version, digest)
+        assert os.path.basename(path) == 'Scripts-9.0.0-%s.pickle' % digest[:32]
+        # Stopping early doesn't leave a partial snapshot behind.
+        with open(self.fn, encoding='utf-8', newline='') as fo:
+            rows = cache.load(self.schema, fo, self.version, self.cache_dir)
+            next(rows)
+            rows.close()
+        assert self.snapshots() == []
+        assert self.load() == fresh
+        assert self.snapshots() == [os.path.basename(path)]
+
+    def test_hit(self):
+        fresh = schema.load_file(self.fn)
+        self.load()
+        # The text is not parsed again.
+        with unittest.mock.patch.object(type(self.schema), '_load', side_effect=AssertionError):
+            rows = self.load()
+        assert rows == fresh
+        assert len(rows) > cache._BATCH_SIZE
+        for row, expected in zip(rows, fresh):
+            assert row[1] is expected[1]
+        assert schema.load_file(self.fn, cache_dir=self.cache_dir) == fresh
+
+    def test_stale(self):
+        old = self.load()
+        with open(self.fn, encoding='utf-8') as fo:
+            text = fo.read()
+        line = '0041..005A    ; Latin # L&  [26] LATIN CAPITAL LETTER A..LATIN CAPITAL LETTER Z\n'
+        assert line in text
+        with open(self.fn, 'w', encoding='utf-8') as fo:
+            fo.write(text.replace(line, ''))
+        new = self.load()
+        assert len(new) == len(old) - 1
+        assert new == schema.load_file(self.fn)
+        assert len(self.snapshots()) == 2
+
+    def test_invalid(self):
+        fresh = self.load()
+        path = os.path.join(self.cache_dir, self.snapshots()[0])
+        with open(path, 'rb') as fo:
+            data = fo.read()
+        header = cache._header(self.schema, self.version, cache.file_digest(self.fn))
+        other = cache._header(self.schema, self.version, '0' * 64)
+        head = cache._MAGIC + pickle.dumps(header, pickle.HIGHEST_PROTOCOL)
+        assert data.startswith(head)
+        bad = [
+            b'not a snapshot\n' + data[len(cache._MAGIC):],
+            data.replace(head, cache._MAGIC + pickle.dumps(other, pickle.HIGHEST_PROTOCOL), 1),
+            # Cut short in the header, in the rows, and just before the end.
+            data[:len(head) - 3],
+            data[:len(head) + 100],
+            data[:-1],
+            head,
+        ]
+        for i, b in enumerate(bad):
+            with open(path, 'wb') as fo:
+                fo.write(b)
+            assert list(cache._read(path, header)) == [], i
+            # Parsed again, and the snapshot replaced.
+            assert self.load() == fresh
+            with open(path, 'rb') as fo:
+                assert fo.read() == data
@@ -0,0 +1,137 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import sys
+import unittest
+import unittest.mock
+import zipfile
+
+from uni.txt import manifest, schema
+
+
+ucd = os.path.join(os.path.dirname(__file__), '../../../www.unicode.org/Public/9.0.0/ucd')
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ucd = os.path.join(self.tmp.name, '9.0.0/ucd')
+        os.makedirs(self.ucd)
+        for f in ['Blocks.txt', 'Jamo.txt', 'ReadMe.txt']:
+            shutil.copy(os.path.join(ucd, f), self.ucd)
+        self.files = [os.path.join(self.ucd, f) for f in ['Blocks.txt', 'Jamo.txt', 'ReadMe.txt']]
+        self.path = os.path.join(self.tmp.name, 'manifest.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def refresh(self, files=None):
+        return manifest.refresh(self.path, self.files if files is None else files, jobs=1)
+
+    def edit(self, f, old, new):
+        fn = os.path.join(self.ucd, f)
+        with open(fn, encoding='utf-8') as fo:
+            text = fo.read()
+        assert old in text
+        with open(fn, 'w', encoding='utf-8') as fo:
+            fo.write(text.replace(old, new, 1))
+
+    def test_refresh(self):
+        blocks, jamo, readme = self.files
+        report = self.refresh()
+        assert report.added == self.files
+        assert report.tables == ['Block', 'Jamo_Short_Name']
+        entries, current = manifest.load(self.path)
+        assert current
+        assert entries[readme] == (entries[readme].digest, None, ())
+        assert self.refresh() == ([blocks, jamo, readme], [], [], [], [])
+        # Comments change the file, but not the rows.
+        self.edit('Blocks.txt', '# Blocks-9.0.0.txt', '# Blocks-9.0.0.txt (draft)')
+        assert self.refresh() == ([jamo, readme], [blocks], [], [], [])
+        self.edit('Jamo.txt', '1100; G ', '1100; GG')
+        assert self.refresh() == ([blocks, readme], [jamo], [], [], ['Jamo_Short_Name'])
+        report = self.refresh([blocks, readme])
+        assert report == ([blocks, readme], [], [], [jamo], ['Jamo_Short_Name'])
+        out = io.StringIO()
+        manifest.print_report(report, file=out)
+        assert out.getvalue() == 'removed %s\nunchanged 2 files\nrebuild Jamo_Short_Name\n' % jamo
+
+    def test_tables(self):
+        fn = os.path.join(ucd, 'PropList.txt')
+        output, tables = manifest._parse((fn, fn), None)
+        assert len(output) == 64
+        assert 'White_Space' in tables
+        assert 'Hyphen' in tables
+
+    def test_archive(self):
+        fn = os.path.join(self.ucd, 'UCD.zip')
+        def write_zip():
+            with zipfile.ZipFile(fn, 'w', zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr('extracted/', '')
+                for f in self.files[:2]:
+                    zf.write(f, os.path.basename(f))
+        write_zip()
+        blocks, jamo = [os.path.join(fn, f) for f in ['Blocks.txt', 'Jamo.txt']]
+        assert self.refresh([fn]) == ([], [], [blocks, jamo], [], ['Block', 'Jamo_Short_Name'])
+        assert self.refresh([fn]) == ([blocks, jamo], [], [], [], [])
+        # Any change reparses every member, but only rebuilds what changed.
+        self.edit('Jamo.txt', '1100; G ', '1100; GG')
+        write_zip()
+        assert self.refresh([fn]) == ([], [blocks, jamo], [], [], ['Jamo_Short_Name'])
+        self.edit('Jamo.txt', '1100; GG', '1100; G ')
+        write_zip()
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), unittest.mock.patch.object(sys, 'stderr', io.StringIO()):
+            schema.main(['--manifest=' + self.path, fn, self.files[2]], 'uni.txt.schema')
+        assert out.getvalue().splitlines()[0] == '# Blocks v9.0.0 utf-8'
+        assert '# Jamo v9.0.0 utf-8' in out.getvalue().splitlines()
+
+    def test_format(self):
+        self.refresh()
+        with open(self.path) as fo:
+            data = json.load(fo)
+        data['format'][0] -= 1
+        with open(self.path, 'w') as fo:
+            json.dump(data, fo)
+        assert manifest.load(self.path)[1] is False
+        # Everything is reparsed, but nothing needs rebuilding.
+        assert self.refresh() == ([], self.files, [], [], [])
+
+    def test_main(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            manifest.main(['--jobs=1', '--cache=' + os.path.join(self.tmp.name, 'cache'), self.path] + self.files, 'uni.txt.manifest')
+        assert out.getvalue().splitlines() == ['added ' + fn for fn in self.files] + [
+            'unchanged 0 files',
+            'rebuild Block',
+            'rebuild Jamo_Short_Name',
+        ]
+        self.edit('Jamo.txt', '1100; G ', '1100; GG')
+        out = io.StringIO()
+        err = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            schema.main(['--manifest=' + self.path] + self.files, 'uni.txt.schema')
+        assert err.getvalue().splitlines() == [
+            'reparsed ' + self.files[1],
+            'unchanged 2 files',
+            'rebuild Jamo_Short_Name',
+        ]
+        assert out.getvalue().startswith('# Jamo v9.0.0 utf-8\n')
@@ -0,0 +1,49 @@
+#   python-uni - complete access to the Unicode® database
+#   Copyright © 2017  Ben Longbons
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Lesser General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Lesser General Public License for more details.
+#
+#   You should have received a copy of the GNU Lesser General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import unittest
+
+from uni.txt import schema
+from uni import prop_alias as alias
+
+
+ucd = os.path.join(os.path.dirname(__file__), '../../../www.unicode.org/Public/9.0.0/ucd')
+
+
+class TestLoadFiles(unittest.TestCase):
+    files = [
+        os.path.join(ucd, 'Blocks.txt'),
+        os.path.join(ucd, 'ReadMe.txt'),
+        os.path.join(ucd, 'Jamo.txt'),
+    ]
+
+    def check(self, rows):
+        blocks, readme, jamo = rows
+        assert blocks[0] == [(0x0000, 0x007F), alias.Block.Basic_Latin]
+        assert readme is None
+        assert jamo[0] == [(0x1100, 0x1100), alias.Jamo_Short_Name.G]
+
+    def test_serial(self):
+        self.check(schema.load_files(self.files, jobs=1))
+
+    def test_unknown(self):
+        assert schema.load_file(os.path.join(ucd, '../charts/index.html')) is None
+
+    def test_parallel(self):
+        rows = schema.load_files(self.files, jobs=2)
+        self.check(rows)
+        # Enum values are singletons even across processes.
+        assert rows[0][0][1] is alias.Block.Basic_Latin